@@ -3,6 +3,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+# Admin site branding
+admin.site.site_header = "AGMall Beauty Products IMS"
+admin.site.site_title = "AGMall Admin"
+admin.site.index_title = "Welcome to AGMall Beauty Products Inventory Management"
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('inventory.urls')),
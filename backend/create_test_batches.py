@@ -7,32 +7,54 @@ Usage:
     python manage.py shell < create_test_batches.py
 
 Or:
-    python create_test_batches.py
+    python create_test_batches.py [-v | --verbose]
+
+Pass -v/--verbose to print every created row instead of per-step totals.
 """
 
 import os
 import sys
 import django
 from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
 
 # Setup Django environment
 if __name__ == "__main__":
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
     django.setup()
 
-from inventory.models import (
-    Item,
-    Brand,
-    ItemBatch,
-    Account,
-    Transaction,
-    ItemTierPricing,
-    Customer,
-)
+# Per-row output is opt-in; by default only per-step totals are printed
+VERBOSE = "-v" in sys.argv or "--verbose" in sys.argv
+
+TEST_CUSTOMERS = [
+    "ABC Beauty Store",
+    "XYZ Cosmetics Shop",
+    "Beauty Corner",
+    "Glamour Palace",
+    "Makeup Studio",
+]
 
 
+@transaction.atomic
 def create_test_data():
     """Create comprehensive test data including batches"""
+    # Imported here so importing this module doesn't load the models
+    from inventory.models import (
+        Item,
+        Brand,
+        ItemBatch,
+        Account,
+        Transaction,
+        ItemTierPricing,
+        Customer,
+    )
+
+    # Test data only: skip waiting for the WAL flush when this transaction
+    # commits. SET LOCAL lasts until the end of the atomic block.
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL synchronous_commit = off")
 
     print("🚀 Creating test data for batch selection...")
 
@@ -60,41 +82,69 @@ def create_test_data():
         {"name": "Eyeshadow Palette", "uom": "pack"},
     ]
 
-    items = []
-    for item_data in test_items:
-        item, created = Item.objects.get_or_create(
-            item_name=item_data["name"], brand=brand, defaults={"uom": item_data["uom"]}
-        )
-        items.append(item)
-        if created:
+    items_by_name = {item.item_name: item for item in Item.objects.filter(brand=brand)}
+
+    new_items = [
+        item_data for item_data in test_items if item_data["name"] not in items_by_name
+    ]
+    if VERBOSE:
+        for item_data in test_items:
+            if item_data["name"] in items_by_name:
+                print(f"ℹ️  Using existing item: {item_data['name']}")
+
+    # bulk_create bypasses Item.save(), so take SKUs from the same sequence
+    # Item.generate_sku() uses
+    skus = Item.objects.bulk_generate_skus(brand.brand_id, len(new_items))
+    items_to_create = [
+        Item(item_name=item_data["name"], brand=brand, uom=item_data["uom"], sku=sku)
+        for item_data, sku in zip(new_items, skus)
+    ]
+
+    for item in Item.objects.bulk_create(items_to_create):
+        items_by_name[item.item_name] = item
+        if VERBOSE:
             print(f"✅ Created item: {item.item_name}")
-        else:
-            print(f"ℹ️  Using existing item: {item.item_name}")
+    print(f"✅ Created {len(items_to_create)} items")
+
+    items = [items_by_name[item_data["name"]] for item_data in test_items]
 
     # 3. Create tier pricing for each item
     pricing_tiers = [
-        ("RD", 100.00),
-        ("PD", 90.00),
-        ("DD", 80.00),
-        ("CD", 70.00),
-        ("RS", 60.00),
-        ("SUB-RS", 50.00),
-        ("SRP", 40.00),
+        ("RD", Decimal("100.00")),
+        ("PD", Decimal("90.00")),
+        ("DD", Decimal("80.00")),
+        ("CD", Decimal("70.00")),
+        ("RS", Decimal("60.00")),
+        ("SUB-RS", Decimal("50.00")),
+        ("SRP", Decimal("40.00")),
     ]
 
+    # Upsert so re-running the script resets fixture prices in one statement
+    tier_pricing_rows = []
     for item in items:
+        # Vary prices slightly between items
+        price_variation = Decimal(hash(item.item_name) % 10)
+
         for tier, base_price in pricing_tiers:
-            # Vary prices slightly between items
-            price_variation = hash(item.item_name) % 10
-            final_price = base_price + price_variation
-
-            tier_pricing, created = ItemTierPricing.objects.get_or_create(
-                item=item,
-                pricing_tier=tier,
-                defaults={"price": Decimal(str(final_price))},
+            tier_pricing_rows.append(
+                ItemTierPricing(
+                    item=item, pricing_tier=tier, price=base_price + price_variation
+                )
             )
-            if created:
-                print(f"📊 Created pricing: {item.item_name} - {tier}: ₱{final_price}")
+
+    ItemTierPricing.objects.bulk_create(
+        tier_pricing_rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["item", "pricing_tier"],
+        update_fields=["price"],
+    )
+    if VERBOSE:
+        for tier_pricing in tier_pricing_rows:
+            print(
+                f"📊 Set pricing: {tier_pricing.item.item_name} - {tier_pricing.pricing_tier}: ₱{tier_pricing.price}"
+            )
+    print(f"📊 Set {len(tier_pricing_rows)} tier pricing records")
 
     # 4. Create or get admin user for transactions
     admin_user, created = Account.objects.get_or_create(
@@ -108,63 +158,82 @@ def create_test_data():
     )
     if created:
         admin_user.set_password("admin123")
-        admin_user.save()
+        admin_user.save(update_fields=["password"])
         print(f"✅ Created admin user: {admin_user.username} (password: admin123)")
 
     # 5. Create incoming transactions and batches
     print("\n📦 Creating inventory batches...")
 
-    for i, item in enumerate(items):
-        # Create an incoming transaction
-        transaction = Transaction.objects.create(
-            brand=brand,
-            account=admin_user,
-            transaction_type="INCOMING",
-            reference_number=f"TEST-BATCH-{item.item_id}",
-            notes=f"Test inventory for {item.item_name}",
-        )
+    # Create 3 batches per item with different quantities and costs; costs
+    # step up by 5.00 per item
+    batches_data = [
+        {"qty": 50, "cost": Decimal("30.00")},
+        {"qty": 30, "cost": Decimal("32.00")},
+        {"qty": 20, "cost": Decimal("28.00")},
+    ]
 
-        # Create 2-3 batches per item with different quantities and costs
-        batches_data = [
-            {"qty": 50, "cost": 30.00 + (i * 5)},
-            {"qty": 30, "cost": 32.00 + (i * 5)},
-            {"qty": 20, "cost": 28.00 + (i * 5)},
-        ]
-
-        for j, batch_data in enumerate(batches_data):
-            batch = ItemBatch.objects.create(
-                item=item,
-                cost_price=Decimal(str(batch_data["cost"])),
-                initial_quantity=batch_data["qty"],
-                remaining_quantity=batch_data["qty"],
-                transaction=transaction,
+    # One incoming transaction per item; reference numbers are set explicitly,
+    # so skipping Transaction.save() loses nothing
+    transactions = Transaction.objects.bulk_create(
+        [
+            Transaction(
+                brand=brand,
+                account=admin_user,
+                transaction_type="INCOMING",
+                reference_number=f"TEST-BATCH-{item.item_id}",
+                notes=f"Test inventory for {item.item_name}",
             )
+            for item in items
+        ],
+        batch_size=200,
+    )
+
+    batches = []
+    for i, (item, transaction_obj) in enumerate(zip(items, transactions)):
+        cost_step = Decimal(i * 5)
+        for batch_data in batches_data:
+            batches.append(
+                ItemBatch(
+                    item=item,
+                    cost_price=batch_data["cost"] + cost_step,
+                    initial_quantity=batch_data["qty"],
+                    remaining_quantity=batch_data["qty"],
+                    transaction=transaction_obj,
+                )
+            )
+
+    # Numbers each item's new batches after its existing ones
+    ItemBatch.create_batches(batches)
+    if VERBOSE:
+        for batch in batches:
             print(
-                f"📦 Created batch: {item.item_name} - Batch {batch.batch_number} - {batch.remaining_quantity} units @ ₱{batch.cost_price}"
+                f"📦 Created batch: {batch.item.item_name} - Batch {batch.batch_number} - {batch.remaining_quantity} units @ ₱{batch.cost_price}"
             )
+    print(f"📦 Created {len(batches)} batches")
 
     # 6. Create test customers
-    test_customers = [
-        "ABC Beauty Store",
-        "XYZ Cosmetics Shop",
-        "Beauty Corner",
-        "Glamour Palace",
-        "Makeup Studio",
-    ]
-
-    for customer_name in test_customers:
-        customer, created = Customer.objects.get_or_create(
+    existing_customers = set(
+        Customer.objects.filter(company_name__in=TEST_CUSTOMERS).values_list(
+            "company_name", flat=True
+        )
+    )
+    customers_to_create = [
+        Customer(
             company_name=customer_name,
-            defaults={
-                "contact_person": "Manager",
-                "address": f"{customer_name} Address",
-                "contact_number": "123-456-7890",
-                "customer_type": "Physical Store",
-                "platform": "whatsapp",
-            },
+            contact_person="Manager",
+            address=f"{customer_name} Address",
+            contact_number="123-456-7890",
+            customer_type="Physical Store",
+            platform="whatsapp",
         )
-        if created:
+        for customer_name in TEST_CUSTOMERS
+        if customer_name not in existing_customers
+    ]
+    Customer.objects.bulk_create(customers_to_create, ignore_conflicts=True)
+    if VERBOSE:
+        for customer in customers_to_create:
             print(f"👥 Created customer: {customer.company_name}")
+    print(f"👥 Created {len(customers_to_create)} customers")
 
     # 7. Create test users with different cost tiers
     test_users = [
@@ -173,31 +242,45 @@ def create_test_data():
         {"username": "rs_user", "cost_tier": "RS", "role": "Sales Rep"},
     ]
 
-    for user_data in test_users:
-        user, created = Account.objects.get_or_create(
+    existing_usernames = set(
+        Account.objects.filter(
+            username__in=[user_data["username"] for user_data in test_users]
+        ).values_list("username", flat=True)
+    )
+
+    # All test users share a password, so hash it once
+    hashed_password = make_password("password123")
+    users_to_create = [
+        Account(
             username=user_data["username"],
-            defaults={
-                "first_name": user_data["cost_tier"],
-                "last_name": "User",
-                "role": user_data["role"],
-                "cost_tier": user_data["cost_tier"],
-            },
+            first_name=user_data["cost_tier"],
+            last_name="User",
+            role=user_data["role"],
+            cost_tier=user_data["cost_tier"],
+            password=hashed_password,
         )
-        if created:
-            user.set_password("password123")
-            user.save()
+        for user_data in test_users
+        if user_data["username"] not in existing_usernames
+    ]
+    Account.objects.bulk_create(users_to_create)
+    if VERBOSE:
+        for user in users_to_create:
             print(
                 f"👤 Created user: {user.username} (cost_tier: {user.cost_tier}, password: password123)"
             )
+    print(f"👤 Created {len(users_to_create)} users")
 
     print("\n🎉 Test data creation completed!")
     print("\n📋 Summary:")
-    print(f"   - Brand: {Brand.objects.count()}")
-    print(f"   - Items: {Item.objects.count()}")
-    print(f"   - Batches: {ItemBatch.objects.count()}")
-    print(f"   - Customers: {Customer.objects.count()}")
-    print(f"   - Users: {Account.objects.count()}")
-    print(f"   - Tier Pricing: {ItemTierPricing.objects.count()}")
+    brands, items, batches, customers, users, tier_pricing = count_rows(
+        Brand, Item, ItemBatch, Customer, Account, ItemTierPricing
+    )
+    print(f"   - Brand: {brands}")
+    print(f"   - Items: {items}")
+    print(f"   - Batches: {batches}")
+    print(f"   - Customers: {customers}")
+    print(f"   - Users: {users}")
+    print(f"   - Tier Pricing: {tier_pricing}")
 
     print("\n🧪 Testing Instructions:")
     print("1. Login with different users:")
@@ -211,21 +294,27 @@ def create_test_data():
     print("\n✅ Ready for testing batch selection!")
 
 
+def count_rows(*models):
+    """Count the rows of each model's table in a single query"""
+    subqueries = ", ".join(
+        f"(SELECT COUNT(*) FROM {connection.ops.quote_name(model._meta.db_table)})"
+        for model in models
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {subqueries}")
+        return cursor.fetchone()
+
+
+@transaction.atomic
 def cleanup_test_data():
     """Remove all test data"""
+    from inventory.models import Brand, Customer, Account
+
     print("🧹 Cleaning up test data...")
 
-    # Delete in reverse order to avoid FK constraints
-    ItemBatch.objects.filter(item__brand__brand_name="Test Beauty Brand").delete()
-    ItemTierPricing.objects.filter(item__brand__brand_name="Test Beauty Brand").delete()
-    Transaction.objects.filter(brand__brand_name="Test Beauty Brand").delete()
-    Item.objects.filter(brand__brand_name="Test Beauty Brand").delete()
+    # Items, batches, tier pricing and transactions cascade from the brand
     Brand.objects.filter(brand_name="Test Beauty Brand").delete()
-    Customer.objects.filter(company_name__endswith="Beauty Store").delete()
-    Customer.objects.filter(company_name__endswith="Shop").delete()
-    Customer.objects.filter(
-        company_name__in=["Beauty Corner", "Glamour Palace", "Makeup Studio"]
-    ).delete()
+    Customer.objects.filter(company_name__in=TEST_CUSTOMERS).delete()
     Account.objects.filter(
         username__in=["batch_test_admin", "pd_user", "dd_user", "rs_user"]
     ).delete()
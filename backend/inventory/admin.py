@@ -1,9 +1,40 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 from .models import (
     Account, Brand, Customer, Item, CustomerBrandPricing, 
     ItemTierPricing, CustomerSpecialPricing, Transaction, TransactionItem, ItemBatch
 )
 
+class ChangeListOnlyMixin:
+    """
+    Load only ``list_only_fields`` for changelist rows. The change form still
+    uses the full queryset, so editing never hits deferred-field queries.
+    """
+    list_only_fields = ()
+    
+    def get_changelist(self, request, **kwargs):
+        changelist_class = super().get_changelist(request, **kwargs)
+        only_fields = self.list_only_fields
+        if not only_fields:
+            return changelist_class
+        
+        class OnlyChangeList(changelist_class):
+            def get_queryset(self, request, exclude_parameters=None):
+                return super().get_queryset(request, exclude_parameters).only(*only_fields)
+        
+        return OnlyChangeList
+
+class WithStrMixin:
+    """
+    Join the relations the model's __str__ reads in every admin queryset.
+    list_select_related only covers the changelist, but autocomplete results
+    and change forms render __str__ too.
+    """
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_str()
+
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
     list_display = ('account_id', 'username', 'first_name', 'last_name', 'role', 'is_active', 'date_joined')
@@ -53,8 +84,10 @@ class BrandAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(ChangeListOnlyMixin, admin.ModelAdmin):
     list_display = ('customer_id', 'company_name', 'contact_person', 'customer_type', 'platform', 'status')
+    # Leaves out the address text
+    list_only_fields = list_display
     list_filter = ('customer_type', 'platform', 'status')
     search_fields = ('company_name', 'contact_person', 'contact_number', 'tin_id')
     ordering = ('company_name',)
@@ -72,8 +105,9 @@ class CustomerAdmin(admin.ModelAdmin):
     )
 
 @admin.register(CustomerBrandPricing)
-class CustomerBrandPricingAdmin(admin.ModelAdmin):
+class CustomerBrandPricingAdmin(WithStrMixin, admin.ModelAdmin):
     list_display = ('customer', 'brand', 'pricing_tier', 'created_at')
+    list_select_related = ('customer', 'brand')
     list_filter = ('pricing_tier', 'brand')
     search_fields = ('customer__company_name', 'brand__brand_name')
     ordering = ('customer__company_name', 'brand__brand_name')
@@ -83,6 +117,7 @@ class CustomerBrandPricingAdmin(admin.ModelAdmin):
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
     list_display = ('item_id', 'item_name', 'brand', 'uom', 'get_total_quantity', 'get_active_batches_count', 'sku')
+    list_select_related = ('brand',)
     list_filter = ('brand', 'uom')
     search_fields = ('item_name', 'sku')
     ordering = ('item_name',)
@@ -96,21 +131,35 @@ class ItemAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Compute the active batch count in the changelist query instead of
+        # one aggregate query per row through the model property
+        return super().get_queryset(request).with_stock()
+    
     def get_total_quantity(self, obj):
         return obj.total_quantity
     get_total_quantity.short_description = 'Total Quantity'
+    get_total_quantity.admin_order_field = 'current_stock'
     
     def get_active_batches_count(self, obj):
         return obj.active_batches_count
     get_active_batches_count.short_description = 'Active Batches'
+    get_active_batches_count.admin_order_field = '_active_batches_count'
     
     autocomplete_fields = ['brand']
 
 @admin.register(ItemBatch)
-class ItemBatchAdmin(admin.ModelAdmin):
+class ItemBatchAdmin(WithStrMixin, ChangeListOnlyMixin, admin.ModelAdmin):
     list_display = ('item', 'batch_number', 'cost_price', 'initial_quantity', 'remaining_quantity', 'created_at')
+    list_select_related = ('item',)
+    list_only_fields = (
+        'item', 'item__item_name', 'item__sku', 'batch_number', 'cost_price',
+        'initial_quantity', 'remaining_quantity', 'created_at'
+    )
     list_filter = ('item__brand', 'created_at')
-    search_fields = ('item__item_name', 'item__sku', 'batch_number')
+    # item_name is trigram indexed; SKUs are matched by prefix and batch
+    # numbers exactly rather than casting every row to text for a substring match
+    search_fields = ('item__item_name', '^item__sku', '=batch_number')
     ordering = ('item__item_name', 'batch_number')
     
     fieldsets = (
@@ -126,8 +175,9 @@ class ItemBatchAdmin(admin.ModelAdmin):
     autocomplete_fields = ['item', 'transaction']
 
 @admin.register(ItemTierPricing)
-class ItemTierPricingAdmin(admin.ModelAdmin):
+class ItemTierPricingAdmin(WithStrMixin, admin.ModelAdmin):
     list_display = ('item', 'pricing_tier', 'price', 'created_at')
+    list_select_related = ('item',)
     list_filter = ('pricing_tier', 'item__brand')
     search_fields = ('item__item_name', 'item__sku')
     ordering = ('item__item_name', 'pricing_tier')
@@ -135,8 +185,9 @@ class ItemTierPricingAdmin(admin.ModelAdmin):
     autocomplete_fields = ['item']
 
 @admin.register(CustomerSpecialPricing)
-class CustomerSpecialPricingAdmin(admin.ModelAdmin):
+class CustomerSpecialPricingAdmin(WithStrMixin, admin.ModelAdmin):
     list_display = ('customer', 'item', 'discount', 'created_by', 'created_at')
+    list_select_related = ('customer', 'item', 'created_by')
     list_filter = ('created_at',)
     search_fields = ('customer__company_name', 'item__item_name')
     ordering = ('-created_at',)
@@ -146,16 +197,28 @@ class CustomerSpecialPricingAdmin(admin.ModelAdmin):
 class TransactionItemInline(admin.TabularInline):
     model = TransactionItem
     extra = 0
-    autocomplete_fields = ['item']
+    show_change_link = True
+    # Autocomplete keeps each row from rendering every item/batch as an option
+    autocomplete_fields = ['item', 'batch']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('item')
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ChangeListOnlyMixin, admin.ModelAdmin):
     list_display = (
         'transaction_id', 'brand', 'customer', 'transaction_type', 
         'is_completed', 'total_amount', 'transacted_date'
     )
+    list_select_related = ('brand', 'customer')
+    # Includes what Brand.__str__ reads
+    list_only_fields = (
+        'brand', 'brand__brand_name', 'brand__vat_classification',
+        'customer', 'customer__company_name', 'transaction_type',
+        'is_completed', 'total_amount', 'transacted_date'
+    )
     list_filter = (
-        'transaction_type', 'is_released', 'is_paid', 'is_or_sent',
+        'transaction_type', 'is_completed', 'is_released', 'is_paid', 'is_or_sent',
         'vat_type', 'transacted_date'
     )
     search_fields = (
@@ -178,18 +241,33 @@ class TransactionAdmin(admin.ModelAdmin):
         ('Additional Information', {
             'fields': ('due_date', 'reference_number', 'notes')
         }),
+        ('Items', {
+            'fields': ('view_items_link',)
+        }),
     )
     
     autocomplete_fields = ['brand', 'customer', 'account']
     inlines = [TransactionItemInline]
     
-    readonly_fields = ['is_completed']
+    readonly_fields = ['is_completed', 'total_amount', 'view_items_link']
+    
+    def view_items_link(self, obj):
+        if obj.pk is None:
+            return '-'
+        url = reverse('admin:inventory_transactionitem_changelist')
+        return format_html(
+            '<a href="{}?transaction__exact={}">View all items in the paginated list</a>',
+            url, obj.pk
+        )
+    view_items_link.short_description = 'All Items'
 
 @admin.register(TransactionItem)
-class TransactionItemAdmin(admin.ModelAdmin):
+class TransactionItemAdmin(WithStrMixin, admin.ModelAdmin):
     list_display = ('transaction', 'item', 'quantity', 'unit_price', 'total_price', 'pricing_tier')
+    list_select_related = ('transaction', 'item')
     list_filter = ('pricing_tier', 'transaction__transaction_type')
     search_fields = ('transaction__reference_number', 'item__item_name')
+    list_per_page = 25
     ordering = ('-created_at',)
     
     autocomplete_fields = ['transaction', 'item']
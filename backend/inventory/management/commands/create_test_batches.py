@@ -1,5 +1,7 @@
+from collections import Counter
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
 from decimal import Decimal
 from inventory.models import (
     Item,
@@ -11,6 +13,14 @@ from inventory.models import (
     Customer,
 )
 
+TEST_CUSTOMERS = [
+    "ABC Beauty Store",
+    "XYZ Cosmetics Shop",
+    "Beauty Corner",
+    "Glamour Palace",
+    "Makeup Studio",
+]
+
 
 class Command(BaseCommand):
     help = "Create test inventory batches for testing batch selection functionality"
@@ -31,6 +41,11 @@ class Command(BaseCommand):
     @transaction.atomic
     def create_test_data(self):
         """Create comprehensive test data including batches"""
+        # Test data only: skip waiting for the WAL flush when this transaction
+        # commits. SET LOCAL lasts until the end of the atomic block.
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = off")
 
         self.stdout.write(
             self.style.SUCCESS("🚀 Creating test data for batch selection...")
@@ -60,45 +75,72 @@ class Command(BaseCommand):
             {"name": "Eyeshadow Palette", "uom": "pack"},
         ]
 
-        items = []
-        for item_data in test_items:
-            item, created = Item.objects.get_or_create(
-                item_name=item_data["name"],
-                brand=brand,
-                defaults={"uom": item_data["uom"]},
-            )
-            items.append(item)
-            if created:
-                self.stdout.write(f"✅ Created item: {item.item_name}")
-            else:
-                self.stdout.write(f"ℹ️  Using existing item: {item.item_name}")
+        items_by_name = {
+            item.item_name: item for item in Item.objects.filter(brand=brand)
+        }
+
+        lines = [
+            f"ℹ️  Using existing item: {item_data['name']}"
+            for item_data in test_items
+            if item_data["name"] in items_by_name
+        ]
+        new_items = [
+            item_data
+            for item_data in test_items
+            if item_data["name"] not in items_by_name
+        ]
+
+        # bulk_create bypasses Item.save(), so take SKUs from the same sequence
+        # Item.generate_sku() uses. Unlike per-row get_or_create, this needs no
+        # savepoint per item.
+        skus = Item.objects.bulk_generate_skus(brand.brand_id, len(new_items))
+        items_to_create = [
+            Item(item_name=item_data["name"], brand=brand, uom=item_data["uom"], sku=sku)
+            for item_data, sku in zip(new_items, skus)
+        ]
+
+        for item in Item.objects.bulk_create(items_to_create):
+            items_by_name[item.item_name] = item
+            lines.append(f"✅ Created item: {item.item_name}")
+        self.write_lines(lines)
+
+        items = [items_by_name[item_data["name"]] for item_data in test_items]
 
         # 3. Create tier pricing for each item
         pricing_tiers = [
-            ("RD", 100.00),
-            ("PD", 90.00),
-            ("DD", 80.00),
-            ("CD", 70.00),
-            ("RS", 60.00),
-            ("SUB-RS", 50.00),
-            ("SRP", 40.00),
+            ("RD", Decimal("100.00")),
+            ("PD", Decimal("90.00")),
+            ("DD", Decimal("80.00")),
+            ("CD", Decimal("70.00")),
+            ("RS", Decimal("60.00")),
+            ("SUB-RS", Decimal("50.00")),
+            ("SRP", Decimal("40.00")),
         ]
 
+        # Upsert so re-running the command resets fixture prices in one statement
+        tier_pricing_rows = []
         for item in items:
+            # Vary prices slightly between items
+            price_variation = Decimal(hash(item.item_name) % 10)
+
             for tier, base_price in pricing_tiers:
-                # Vary prices slightly between items
-                price_variation = hash(item.item_name) % 10
-                final_price = base_price + price_variation
-
-                tier_pricing, created = ItemTierPricing.objects.get_or_create(
-                    item=item,
-                    pricing_tier=tier,
-                    defaults={"price": Decimal(str(final_price))},
-                )
-                if created:
-                    self.stdout.write(
-                        f"📊 Created pricing: {item.item_name} - {tier}: ₱{final_price}"
+                tier_pricing_rows.append(
+                    ItemTierPricing(
+                        item=item, pricing_tier=tier, price=base_price + price_variation
                     )
+                )
+
+        ItemTierPricing.objects.bulk_create(
+            tier_pricing_rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["item", "pricing_tier"],
+            update_fields=["price"],
+        )
+        self.write_lines(
+            f"📊 Set pricing: {tier_pricing.item.item_name} - {tier_pricing.pricing_tier}: ₱{tier_pricing.price}"
+            for tier_pricing in tier_pricing_rows
+        )
 
         # 4. Create or get admin user for transactions
         admin_user, created = Account.objects.get_or_create(
@@ -108,11 +150,10 @@ class Command(BaseCommand):
                 "last_name": "Admin",
                 "role": "Admin",
                 "cost_tier": None,  # No restrictions
+                "password": make_password("admin123"),
             },
         )
         if created:
-            admin_user.set_password("admin123")
-            admin_user.save()
             self.stdout.write(
                 f"✅ Created admin user: {admin_user.username} (password: admin123)"
             )
@@ -120,6 +161,15 @@ class Command(BaseCommand):
         # 5. Create incoming transactions and batches
         self.stdout.write("\n📦 Creating inventory batches...")
 
+        # Create 3 batches per item with different quantities and costs; costs
+        # step up by 5.00 per item
+        batches_data = [
+            {"qty": 50, "cost": Decimal("30.00")},
+            {"qty": 30, "cost": Decimal("32.00")},
+            {"qty": 20, "cost": Decimal("28.00")},
+        ]
+
+        batches = []
         for i, item in enumerate(items):
             # Create an incoming transaction
             transaction_obj = Transaction.objects.create(
@@ -130,47 +180,48 @@ class Command(BaseCommand):
                 notes=f"Test inventory for {item.item_name}",
             )
 
-            # Create 2-3 batches per item with different quantities and costs
-            batches_data = [
-                {"qty": 50, "cost": 30.00 + (i * 5)},
-                {"qty": 30, "cost": 32.00 + (i * 5)},
-                {"qty": 20, "cost": 28.00 + (i * 5)},
-            ]
-
-            for j, batch_data in enumerate(batches_data):
-                batch = ItemBatch.objects.create(
-                    item=item,
-                    cost_price=Decimal(str(batch_data["cost"])),
-                    initial_quantity=batch_data["qty"],
-                    remaining_quantity=batch_data["qty"],
-                    transaction=transaction_obj,
-                )
-                self.stdout.write(
-                    f"📦 Created batch: {item.item_name} - Batch {batch.batch_number} - {batch.remaining_quantity} units @ ₱{batch.cost_price}"
+            cost_step = Decimal(i * 5)
+            for batch_data in batches_data:
+                batches.append(
+                    ItemBatch(
+                        item=item,
+                        cost_price=batch_data["cost"] + cost_step,
+                        initial_quantity=batch_data["qty"],
+                        remaining_quantity=batch_data["qty"],
+                        transaction=transaction_obj,
+                    )
                 )
 
-        # 6. Create test customers
-        test_customers = [
-            "ABC Beauty Store",
-            "XYZ Cosmetics Shop",
-            "Beauty Corner",
-            "Glamour Palace",
-            "Makeup Studio",
-        ]
+        # Numbers each item's new batches after its existing ones
+        ItemBatch.create_batches(batches)
+        self.write_lines(
+            f"📦 Created batch: {batch.item.item_name} - Batch {batch.batch_number} - {batch.remaining_quantity} units @ ₱{batch.cost_price}"
+            for batch in batches
+        )
 
-        for customer_name in test_customers:
-            customer, created = Customer.objects.get_or_create(
+        # 6. Create test customers
+        existing_customers = set(
+            Customer.objects.filter(company_name__in=TEST_CUSTOMERS).values_list(
+                "company_name", flat=True
+            )
+        )
+        customers_to_create = [
+            Customer(
                 company_name=customer_name,
-                defaults={
-                    "contact_person": "Manager",
-                    "address": f"{customer_name} Address",
-                    "contact_number": "123-456-7890",
-                    "customer_type": "Physical Store",
-                    "platform": "whatsapp",
-                },
+                contact_person="Manager",
+                address=f"{customer_name} Address",
+                contact_number="123-456-7890",
+                customer_type="Physical Store",
+                platform="whatsapp",
             )
-            if created:
-                self.stdout.write(f"👥 Created customer: {customer.company_name}")
+            for customer_name in TEST_CUSTOMERS
+            if customer_name not in existing_customers
+        ]
+        Customer.objects.bulk_create(customers_to_create, ignore_conflicts=True)
+        self.write_lines(
+            f"👥 Created customer: {customer.company_name}"
+            for customer in customers_to_create
+        )
 
         # 7. Create test users with different cost tiers
         test_users = [
@@ -179,31 +230,43 @@ class Command(BaseCommand):
             {"username": "rs_user", "cost_tier": "RS", "role": "Sales Rep"},
         ]
 
-        for user_data in test_users:
-            user, created = Account.objects.get_or_create(
+        existing_usernames = set(
+            Account.objects.filter(
+                username__in=[user_data["username"] for user_data in test_users]
+            ).values_list("username", flat=True)
+        )
+
+        # All test users share a password, so hash it once
+        hashed_password = make_password("password123")
+        users_to_create = [
+            Account(
                 username=user_data["username"],
-                defaults={
-                    "first_name": user_data["cost_tier"],
-                    "last_name": "User",
-                    "role": user_data["role"],
-                    "cost_tier": user_data["cost_tier"],
-                },
+                first_name=user_data["cost_tier"],
+                last_name="User",
+                role=user_data["role"],
+                cost_tier=user_data["cost_tier"],
+                password=hashed_password,
             )
-            if created:
-                user.set_password("password123")
-                user.save()
-                self.stdout.write(
-                    f"👤 Created user: {user.username} (cost_tier: {user.cost_tier}, password: password123)"
-                )
+            for user_data in test_users
+            if user_data["username"] not in existing_usernames
+        ]
+        Account.objects.bulk_create(users_to_create)
+        self.write_lines(
+            f"👤 Created user: {user.username} (cost_tier: {user.cost_tier}, password: password123)"
+            for user in users_to_create
+        )
 
         self.stdout.write(self.style.SUCCESS("\n🎉 Test data creation completed!"))
         self.stdout.write("\n📋 Summary:")
-        self.stdout.write(f"   - Brands: {Brand.objects.count()}")
-        self.stdout.write(f"   - Items: {Item.objects.count()}")
-        self.stdout.write(f"   - Batches: {ItemBatch.objects.count()}")
-        self.stdout.write(f"   - Customers: {Customer.objects.count()}")
-        self.stdout.write(f"   - Users: {Account.objects.count()}")
-        self.stdout.write(f"   - Tier Pricing: {ItemTierPricing.objects.count()}")
+        brands, items, batches, customers, users, tier_pricing = self.count_rows(
+            Brand, Item, ItemBatch, Customer, Account, ItemTierPricing
+        )
+        self.stdout.write(f"   - Brands: {brands}")
+        self.stdout.write(f"   - Items: {items}")
+        self.stdout.write(f"   - Batches: {batches}")
+        self.stdout.write(f"   - Customers: {customers}")
+        self.stdout.write(f"   - Users: {users}")
+        self.stdout.write(f"   - Tier Pricing: {tier_pricing}")
 
         self.stdout.write("\n🧪 Testing Instructions:")
         self.stdout.write("1. Login with different users:")
@@ -220,60 +283,47 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("\n✅ Ready for testing batch selection!"))
 
+    def write_lines(self, lines):
+        """Write a group of output lines with a single stdout write"""
+        output = "\n".join(lines)
+        if output:
+            self.stdout.write(output)
+
+    def count_rows(self, *models):
+        """Count the rows of each model's table in a single query"""
+        subqueries = ", ".join(
+            f"(SELECT COUNT(*) FROM {connection.ops.quote_name(model._meta.db_table)})"
+            for model in models
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {subqueries}")
+            return cursor.fetchone()
+
     @transaction.atomic
     def cleanup_test_data(self):
         """Remove all test data"""
         self.stdout.write(self.style.WARNING("🧹 Cleaning up test data..."))
 
-        # Delete in reverse order to avoid FK constraints
-        deleted_batches = ItemBatch.objects.filter(
-            item__brand__brand_name="Test Beauty Brand"
-        ).count()
-        ItemBatch.objects.filter(item__brand__brand_name="Test Beauty Brand").delete()
-
-        deleted_pricing = ItemTierPricing.objects.filter(
-            item__brand__brand_name="Test Beauty Brand"
-        ).count()
-        ItemTierPricing.objects.filter(
-            item__brand__brand_name="Test Beauty Brand"
-        ).delete()
-
-        deleted_transactions = Transaction.objects.filter(
-            brand__brand_name="Test Beauty Brand"
-        ).count()
-        Transaction.objects.filter(brand__brand_name="Test Beauty Brand").delete()
-
-        deleted_items = Item.objects.filter(
-            brand__brand_name="Test Beauty Brand"
-        ).count()
-        Item.objects.filter(brand__brand_name="Test Beauty Brand").delete()
-
-        deleted_brands = Brand.objects.filter(brand_name="Test Beauty Brand").count()
-        Brand.objects.filter(brand_name="Test Beauty Brand").delete()
-
-        deleted_customers = 0
-        deleted_customers += Customer.objects.filter(
-            company_name__endswith="Beauty Store"
-        ).count()
-        deleted_customers += Customer.objects.filter(
-            company_name__endswith="Shop"
-        ).count()
-        deleted_customers += Customer.objects.filter(
-            company_name__in=["Beauty Corner", "Glamour Palace", "Makeup Studio"]
-        ).count()
-
-        Customer.objects.filter(company_name__endswith="Beauty Store").delete()
-        Customer.objects.filter(company_name__endswith="Shop").delete()
-        Customer.objects.filter(
-            company_name__in=["Beauty Corner", "Glamour Palace", "Makeup Studio"]
-        ).delete()
-
-        deleted_users = Account.objects.filter(
-            username__in=["batch_test_admin", "pd_user", "dd_user", "rs_user"]
-        ).count()
-        Account.objects.filter(
-            username__in=["batch_test_admin", "pd_user", "dd_user", "rs_user"]
-        ).delete()
+        # Items, batches, tier pricing and transactions cascade from the brand;
+        # delete() reports the rows it removed per model
+        deleted = Counter()
+        for queryset in (
+            Brand.objects.filter(brand_name="Test Beauty Brand"),
+            Customer.objects.filter(company_name__in=TEST_CUSTOMERS),
+            Account.objects.filter(
+                username__in=["batch_test_admin", "pd_user", "dd_user", "rs_user"]
+            ),
+        ):
+            _, deleted_by_model = queryset.delete()
+            deleted.update(deleted_by_model)
+
+        deleted_brands = deleted[Brand._meta.label]
+        deleted_items = deleted[Item._meta.label]
+        deleted_batches = deleted[ItemBatch._meta.label]
+        deleted_customers = deleted[Customer._meta.label]
+        deleted_users = deleted[Account._meta.label]
+        deleted_pricing = deleted[ItemTierPricing._meta.label]
+        deleted_transactions = deleted[Transaction._meta.label]
 
         self.stdout.write(self.style.SUCCESS("✅ Test data cleaned up!"))
         self.stdout.write(f"   - Deleted {deleted_brands} brands")
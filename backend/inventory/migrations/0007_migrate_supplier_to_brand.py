@@ -6,15 +6,11 @@ def migrate_suppliers_to_brands(apps, schema_editor):
     """Transfer all supplier data to brand table"""
     Supplier = apps.get_model('inventory', 'Supplier')
     Brand = apps.get_model('inventory', 'Brand')
-    Item = apps.get_model('inventory', 'Item')
-    Transaction = apps.get_model('inventory', 'Transaction')
     
-    # Create Brand entries for each Supplier
-    supplier_to_brand_mapping = {}
-    
-    for supplier in Supplier.objects.all():
-        # Create corresponding brand
-        brand = Brand.objects.create(
+    # Create Brand entries for each Supplier. Items and transactions are
+    # relinked to the new brands in 0008.
+    brands = [
+        Brand(
             brand_name=supplier.supplier_name,
             street_number=supplier.street_number,
             street_name=supplier.street_name,
@@ -30,21 +26,10 @@ def migrate_suppliers_to_brands(apps, schema_editor):
             vat_classification='VAT',  # Default value
             status=supplier.status
         )
-        supplier_to_brand_mapping[supplier.supplier_id] = brand.brand_id
-        print(f"Migrated supplier '{supplier.supplier_name}' to brand '{brand.brand_name}'")
-    
-    # Update Items to use brand instead of supplier
-    for item in Item.objects.all():
-        if item.supplier_id in supplier_to_brand_mapping:
-            brand_id = supplier_to_brand_mapping[item.supplier_id]
-            # This will be handled by the schema migration
-            print(f"Item '{item.item_name}' will be linked to brand_id {brand_id}")
-    
-    # Update Transactions to use brand instead of supplier  
-    for transaction in Transaction.objects.all():
-        if transaction.supplier_id and transaction.supplier_id in supplier_to_brand_mapping:
-            brand_id = supplier_to_brand_mapping[transaction.supplier_id]
-            print(f"Transaction {transaction.transaction_id} will be linked to brand_id {brand_id}")
+        for supplier in Supplier.objects.iterator(chunk_size=1000)
+    ]
+    Brand.objects.bulk_create(brands, batch_size=500)
+    print(f"Migrated {len(brands)} suppliers to brands")
 
 def reverse_migration(apps, schema_editor):
     """Reverse the migration if needed"""
@@ -4,32 +4,52 @@
 from django.db import migrations, models
 import django.db.models.deletion
 
+# Rows are streamed and written back in chunks of this size
+BATCH_SIZE = 1000
+
+def get_supplier_to_brand_mapping(Supplier, Brand):
+    """Map supplier IDs to the IDs of the brands sharing their names"""
+    brand_by_name = dict(Brand.objects.values_list('brand_name', 'brand_id'))
+    
+    supplier_to_brand = {}
+    for supplier_id, supplier_name in Supplier.objects.values_list('supplier_id', 'supplier_name'):
+        if supplier_name in brand_by_name:
+            supplier_to_brand[supplier_id] = brand_by_name[supplier_name]
+        else:
+            print(f"Warning: No brand found for supplier '{supplier_name}'")
+    return supplier_to_brand
+
 def update_item_brand_relationships(apps, schema_editor):
     """Update Items to use their corresponding brand instead of supplier"""
     Item = apps.get_model('inventory', 'Item')
     Supplier = apps.get_model('inventory', 'Supplier')
     Brand = apps.get_model('inventory', 'Brand')
     
-    # Create a mapping from supplier names to brand IDs
-    supplier_to_brand = {}
-    for supplier in Supplier.objects.all():
-        try:
-            brand = Brand.objects.get(brand_name=supplier.supplier_name)
-            supplier_to_brand[supplier.supplier_id] = brand.brand_id
-        except Brand.DoesNotExist:
-            print(f"Warning: No brand found for supplier '{supplier.supplier_name}'")
+    supplier_to_brand = get_supplier_to_brand_mapping(Supplier, Brand)
     
     # Update items to use brand instead of supplier
     items_updated = 0
-    for item in Item.objects.all():
-        if item.supplier_id and item.supplier_id in supplier_to_brand:
-            brand_id = supplier_to_brand[item.supplier_id]
-            item.brand_id = brand_id
-            item.save()
-            items_updated += 1
-            print(f"Updated item '{item.item_name}' to use brand_id {brand_id}")
-        elif item.supplier_id:
-            print(f"Warning: Item '{item.item_name}' has supplier_id {item.supplier_id} but no matching brand found")
+    items_to_update = []
+    for item in (
+        Item.objects.filter(supplier_id__in=supplier_to_brand)
+        .only('item_id', 'supplier_id', 'brand_id')
+        .iterator(chunk_size=BATCH_SIZE)
+    ):
+        item.brand_id = supplier_to_brand[item.supplier_id]
+        items_to_update.append(item)
+        if len(items_to_update) >= BATCH_SIZE:
+            Item.objects.bulk_update(items_to_update, ['brand'])
+            items_updated += len(items_to_update)
+            items_to_update.clear()
+    Item.objects.bulk_update(items_to_update, ['brand'])
+    items_updated += len(items_to_update)
+    
+    for item_name, supplier_id in (
+        Item.objects.filter(supplier_id__isnull=False)
+        .exclude(supplier_id__in=supplier_to_brand)
+        .values_list('item_name', 'supplier_id')
+    ):
+        print(f"Warning: Item '{item_name}' has supplier_id {supplier_id} but no matching brand found")
     
     print(f"Updated {items_updated} items to use brand relationships")
 
@@ -39,26 +59,31 @@ def update_transaction_brand_relationships(apps, schema_editor):
     Supplier = apps.get_model('inventory', 'Supplier')
     Brand = apps.get_model('inventory', 'Brand')
     
-    # Create a mapping from supplier names to brand IDs
-    supplier_to_brand = {}
-    for supplier in Supplier.objects.all():
-        try:
-            brand = Brand.objects.get(brand_name=supplier.supplier_name)
-            supplier_to_brand[supplier.supplier_id] = brand.brand_id
-        except Brand.DoesNotExist:
-            print(f"Warning: No brand found for supplier '{supplier.supplier_name}'")
+    supplier_to_brand = get_supplier_to_brand_mapping(Supplier, Brand)
     
     # Update transactions to use brand instead of supplier
     transactions_updated = 0
-    for transaction in Transaction.objects.all():
-        if transaction.supplier_id and transaction.supplier_id in supplier_to_brand:
-            brand_id = supplier_to_brand[transaction.supplier_id]
-            transaction.brand_id = brand_id
-            transaction.save()
-            transactions_updated += 1
-            print(f"Updated transaction {transaction.transaction_id} to use brand_id {brand_id}")
-        elif transaction.supplier_id:
-            print(f"Warning: Transaction {transaction.transaction_id} has supplier_id {transaction.supplier_id} but no matching brand found")
+    transactions_to_update = []
+    for transaction in (
+        Transaction.objects.filter(supplier_id__in=supplier_to_brand)
+        .only('transaction_id', 'supplier_id', 'brand_id')
+        .iterator(chunk_size=BATCH_SIZE)
+    ):
+        transaction.brand_id = supplier_to_brand[transaction.supplier_id]
+        transactions_to_update.append(transaction)
+        if len(transactions_to_update) >= BATCH_SIZE:
+            Transaction.objects.bulk_update(transactions_to_update, ['brand'])
+            transactions_updated += len(transactions_to_update)
+            transactions_to_update.clear()
+    Transaction.objects.bulk_update(transactions_to_update, ['brand'])
+    transactions_updated += len(transactions_to_update)
+    
+    for transaction_id, supplier_id in (
+        Transaction.objects.filter(supplier_id__isnull=False)
+        .exclude(supplier_id__in=supplier_to_brand)
+        .values_list('transaction_id', 'supplier_id')
+    ):
+        print(f"Warning: Transaction {transaction_id} has supplier_id {supplier_id} but no matching brand found")
     
     print(f"Updated {transactions_updated} transactions to use brand relationships")
 
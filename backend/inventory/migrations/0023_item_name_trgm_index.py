@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:28
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0022_add_account_cost_tier'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['item_name'], name='item_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
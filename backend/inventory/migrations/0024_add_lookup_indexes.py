@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0023_item_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['sku'], name='item_sku_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='itembatch',
+            index=models.Index(fields=['item', 'remaining_quantity'], name='batch_item_remaining_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['reference_number'], name='txn_reference_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0024_add_lookup_indexes'),
+    ]
+
+    # A regular column can't be altered into a generated one, so drop the
+    # stored totals and let the database recompute them
+    operations = [
+        migrations.RemoveField(
+            model_name='transactionitem',
+            name='total_price',
+        ),
+        migrations.AddField(
+            model_name='transactionitem',
+            name='total_price',
+            field=models.GeneratedField(db_persist=True, expression=models.F('quantity') * models.F('unit_price'), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+    ]
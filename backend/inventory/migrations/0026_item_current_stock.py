@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:36
+
+from django.db import migrations, models
+
+# Keeps inventory_item.current_stock equal to the sum of its batches'
+# remaining_quantity on every batch insert, update and delete
+CREATE_STOCK_TRIGGER = """
+CREATE OR REPLACE FUNCTION inventory_item_batch_sync_stock() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.item_id = OLD.item_id THEN
+        UPDATE inventory_item
+        SET current_stock = current_stock + NEW.remaining_quantity - OLD.remaining_quantity
+        WHERE item_id = NEW.item_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE inventory_item
+        SET current_stock = current_stock - OLD.remaining_quantity
+        WHERE item_id = OLD.item_id;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        UPDATE inventory_item
+        SET current_stock = current_stock + NEW.remaining_quantity
+        WHERE item_id = NEW.item_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventory_item_batch_sync_stock
+AFTER INSERT OR DELETE OR UPDATE OF item_id, remaining_quantity ON inventory_item_batch
+FOR EACH ROW EXECUTE FUNCTION inventory_item_batch_sync_stock();
+"""
+
+DROP_STOCK_TRIGGER = """
+DROP TRIGGER IF EXISTS inventory_item_batch_sync_stock ON inventory_item_batch;
+DROP FUNCTION IF EXISTS inventory_item_batch_sync_stock();
+"""
+
+BACKFILL_STOCK = """
+UPDATE inventory_item
+SET current_stock = COALESCE(
+    (SELECT SUM(remaining_quantity) FROM inventory_item_batch
+     WHERE inventory_item_batch.item_id = inventory_item.item_id),
+    0
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0025_transactionitem_total_price_generated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='current_stock',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, help_text="Sum of remaining_quantity over this item's batches, kept up to date by a database trigger on inventory_item_batch."),
+        ),
+        migrations.RunSQL(CREATE_STOCK_TRIGGER, DROP_STOCK_TRIGGER),
+        migrations.RunSQL(BACKFILL_STOCK, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0026_item_current_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='is_completed',
+            field=models.GeneratedField(db_persist=True, expression=models.ExpressionWrapper(models.Q(models.Q(('transaction_type', 'OUTGOING'), _negated=True), models.Q(('is_or_sent', True), ('is_paid', True), ('is_released', True)), _connector='OR'), output_field=models.BooleanField()), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['is_completed', 'transacted_date'], name='txn_completed_date_idx'),
+        ),
+    ]
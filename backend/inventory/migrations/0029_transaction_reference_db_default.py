@@ -0,0 +1,57 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:41
+
+from django.db import migrations, models
+
+# Returns the next YEAR-NNNN reference number. Each year is numbered by its own
+# sequence (see Transaction.reference_sequence_name()), created on first use
+# to continue after any numbers already issued that year.
+CREATE_REFERENCE_FUNCTION = """
+CREATE OR REPLACE FUNCTION next_transaction_reference() RETURNS text AS $$
+DECLARE
+    current_year text := to_char(now(), 'YYYY');
+    sequence_name text := 'transaction_reference_' || current_year || '_seq';
+    start_number bigint;
+    next_number bigint;
+BEGIN
+    IF to_regclass(sequence_name) IS NULL THEN
+        SELECT COALESCE(MAX(substr(reference_number, 6)::bigint), 0) + 1
+        INTO start_number
+        FROM "transaction"
+        WHERE reference_number LIKE current_year || '-%'
+          AND reference_number ~ ('^' || current_year || '-[0-9]+$');
+        BEGIN
+            EXECUTE format(
+                'CREATE SEQUENCE IF NOT EXISTS %I START WITH %s',
+                sequence_name, start_number
+            );
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            -- A concurrent transaction created it first
+            NULL;
+        END;
+    END IF;
+
+    next_number := nextval(sequence_name);
+    RETURN current_year || '-' || lpad(next_number::text, greatest(4, length(next_number::text)), '0');
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_REFERENCE_FUNCTION = """
+DROP FUNCTION IF EXISTS next_transaction_reference();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0028_add_transaction_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_REFERENCE_FUNCTION, DROP_REFERENCE_FUNCTION),
+        migrations.AlterField(
+            model_name='transaction',
+            name='reference_number',
+            field=models.CharField(blank=True, db_default=models.Func(function='next_transaction_reference', output_field=models.CharField()), max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0029_transaction_reference_db_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itembatch',
+            name='batch_number',
+            field=models.PositiveSmallIntegerField(help_text='Auto-generated batch number for the item, starting from 1.'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:43
+
+from django.db import migrations, models
+
+# Rows written before these checks existed would make adding them fail:
+# - a transaction line with quantity 0 has no effect on stock or totals,
+#   so it is deleted
+# - a special price whose discount isn't negative doesn't discount
+#   anything, so it is deleted and the customer falls back to tier pricing
+# - a batch with more remaining than it started with gets its initial
+#   quantity raised, leaving the stock count as it was
+FIX_VIOLATING_ROWS = """
+DELETE FROM transaction_item WHERE quantity = 0;
+DELETE FROM customer_special_pricing WHERE discount >= 0;
+UPDATE inventory_item_batch
+SET initial_quantity = remaining_quantity
+WHERE remaining_quantity > initial_quantity;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0030_itembatch_batch_number_smallint'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FIX_VIOLATING_ROWS, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='customerspecialpricing',
+            constraint=models.CheckConstraint(check=models.Q(('discount__lt', 0)), name='special_pricing_negative', violation_error_message='Discount must be a negative value.'),
+        ),
+        migrations.AddConstraint(
+            model_name='itembatch',
+            constraint=models.CheckConstraint(check=models.Q(('remaining_quantity__lte', models.F('initial_quantity'))), name='batch_remaining_lte_initial'),
+        ),
+        migrations.AddConstraint(
+            model_name='transactionitem',
+            constraint=models.CheckConstraint(check=models.Q(('quantity', 0), _negated=True), name='txn_item_qty_nonzero'),
+        ),
+    ]
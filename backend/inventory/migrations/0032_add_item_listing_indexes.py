@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:44
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; building the
+    # indexes this way doesn't block writes to these tables
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0031_add_check_constraints'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='item',
+            index=models.Index(fields=['brand', 'item_name'], name='item_brand_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transactionitem',
+            index=models.Index(fields=['item', '-created_at'], name='txn_item_item_created_idx'),
+        ),
+    ]
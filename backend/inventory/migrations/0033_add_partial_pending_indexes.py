@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:49
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0032_add_item_listing_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='itembatch',
+            index=models.Index(condition=models.Q(('remaining_quantity__gt', 0)), fields=['item', 'batch_number'], name='batch_available_fifo_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['account', 'transacted_date'], name='txn_pending_account_date_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0033_add_partial_pending_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='item',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('item_name'), models.F('brand'), name='item_name_lower_brand_uniq'),
+        ),
+    ]
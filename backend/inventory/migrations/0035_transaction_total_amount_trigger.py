@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-15 22:51
+
+from django.db import migrations, models
+
+# Keeps transaction.total_amount equal to the sum of its items' total_price
+# on every transaction item insert, update and delete
+CREATE_TOTAL_TRIGGER = """
+CREATE OR REPLACE FUNCTION transaction_item_sync_total() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.transaction_id = OLD.transaction_id THEN
+        UPDATE "transaction"
+        SET total_amount = total_amount + NEW.total_price - OLD.total_price
+        WHERE transaction_id = NEW.transaction_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE "transaction"
+        SET total_amount = total_amount - OLD.total_price
+        WHERE transaction_id = OLD.transaction_id;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        UPDATE "transaction"
+        SET total_amount = total_amount + NEW.total_price
+        WHERE transaction_id = NEW.transaction_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER transaction_item_sync_total
+AFTER INSERT OR DELETE OR UPDATE OF transaction_id, quantity, unit_price ON transaction_item
+FOR EACH ROW EXECUTE FUNCTION transaction_item_sync_total();
+"""
+
+DROP_TOTAL_TRIGGER = """
+DROP TRIGGER IF EXISTS transaction_item_sync_total ON transaction_item;
+DROP FUNCTION IF EXISTS transaction_item_sync_total();
+"""
+
+BACKFILL_TOTAL = """
+UPDATE "transaction"
+SET total_amount = COALESCE(
+    (SELECT SUM(total_price) FROM transaction_item
+     WHERE transaction_item.transaction_id = "transaction".transaction_id),
+    0
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0034_item_name_lower_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text="Sum of total_price over this transaction's items, kept up to date by a database trigger on transaction_item.", max_digits=12),
+        ),
+        migrations.RunSQL(CREATE_TOTAL_TRIGGER, DROP_TOTAL_TRIGGER),
+        migrations.RunSQL(BACKFILL_TOTAL, migrations.RunSQL.noop),
+    ]
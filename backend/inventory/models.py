@@ -1,42 +1,119 @@
+from collections import Counter
+from types import MappingProxyType
+
 from django.core.validators import RegexValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import Sum
+from django.contrib.postgres.indexes import GinIndex
+from django.db import (
+    IntegrityError,
+    connection,
+    connections,
+    models,
+    router,
+    transaction,
+)
+from django.db.models import (
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    Max,
+    Prefetch,
+    Q,
+    When,
+)
+from django.db.models.expressions import DatabaseDefault
+from django.db.models.functions import Cast, Lower, Substr
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 # Pricing tier choices - shared across models
-PRICING_TIER_CHOICES = [
-    ("SRP", "Suggested Retail Price"),
-    ("RD", "Regional Distributor"),
-    ("PD", "Provincial Distributor"),
-    ("DD", "District Distributor"),
-    ("CD", "City Distributor"),
-    ("RS", "Reseller"),
-    ("SUB-RS", "Sub-Reseller"),
-]
-
-PRICING_TIER_HIERARCHY = {
-    "RD": 0,
-    "PD": 1,
-    "DD": 2,
-    "CD": 3,
-    "RS": 4,
-    "SUB-RS": 5,
-    "SRP": 6,
-}
+class PricingTier(models.TextChoices):
+    SRP = "SRP", "Suggested Retail Price"
+    RD = "RD", "Regional Distributor"
+    PD = "PD", "Provincial Distributor"
+    DD = "DD", "District Distributor"
+    CD = "CD", "City Distributor"
+    RS = "RS", "Reseller"
+    SUB_RS = "SUB-RS", "Sub-Reseller"
+
+
+PRICING_TIER_CHOICES = PricingTier.choices
+
+
+# Active/Archived status shared by brands and customers
+class Status(models.TextChoices):
+    ACTIVE = "Active", "Active"
+    ARCHIVED = "Archived", "Archived"
+
+
+# The lookup tables below are built once at import and shared by every
+# request, so they're exposed read-only
+
+# Built once; get_pricing_tier_display() rebuilds it per call
+PRICING_TIER_DISPLAY = MappingProxyType(dict(PRICING_TIER_CHOICES))
+
+PRICING_TIER_HIERARCHY = MappingProxyType(
+    {
+        "RD": 0,
+        "PD": 1,
+        "DD": 2,
+        "CD": 3,
+        "RS": 4,
+        "SUB-RS": 5,
+        "SRP": 6,
+    }
+)
+
+# Tiers each cost tier may sell at (every tier below it in the hierarchy),
+# computed once at import instead of on every permission check
+ALL_PRICING_TIERS = tuple(PricingTier.values)
+ALLOWED_SELLING_TIERS = MappingProxyType(
+    {
+        cost_tier: tuple(
+            tier_code
+            for tier_code, tier_level in PRICING_TIER_HIERARCHY.items()
+            if tier_level > cost_tier_level
+        )
+        for cost_tier, cost_tier_level in PRICING_TIER_HIERARCHY.items()
+    }
+)
+# Valid pricing tier codes, for membership checks that don't scan the choices
+PRICING_TIER_CODES = frozenset(ALL_PRICING_TIERS)
+_ALLOWED_SELLING_TIER_SETS = MappingProxyType(
+    {cost_tier: frozenset(tiers) for cost_tier, tiers in ALLOWED_SELLING_TIERS.items()}
+)
+
+
+def check_pricing_tier(tier):
+    """Raise ValueError for a pricing tier code that isn't one of the choices"""
+    if tier not in PRICING_TIER_CODES:
+        raise ValueError(f"Invalid pricing tier: {tier!r}")
+
+
+class DisplayQuerySet(models.QuerySet):
+    """
+    QuerySet for models whose __str__ follows foreign keys. Each model lists
+    those relations in ``str_related_fields``.
+    """
+
+    def with_str(self):
+        """Join the relations __str__ reads so listing rows doesn't query per row"""
+        return self.select_related(*self.model.str_related_fields)
 
 
 class Account(AbstractUser):
+    class Role(models.TextChoices):
+        ADMIN = "Admin", "Admin"
+        LEADER = "Leader", "Leader"
+        SALES_REP = "Sales Rep", "Sales Rep"
+
+    ROLE_CHOICES = Role.choices
+
     account_id = models.AutoField(primary_key=True)
     username = models.CharField(max_length=30, unique=True)
-    role = models.CharField(
-        max_length=20,
-        choices=[
-            ("Admin", "Admin"),
-            ("Leader", "Leader"),
-            ("Sales Rep", "Sales Rep"),
-        ],
-    )
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     cost_tier = models.CharField(
         max_length=10,
         choices=PRICING_TIER_CHOICES,
@@ -55,42 +132,103 @@ class Account(AbstractUser):
         """
         Returns the pricing tiers this user is allowed to sell at.
         Users can only sell at tiers below their own cost tier.
+        The tuple is shared between calls, so callers must not rely on a copy.
         """
         if not self.cost_tier:
             # If no cost tier assigned, allow all tiers (for admins/special cases)
-            return [tier[0] for tier in PRICING_TIER_CHOICES]
-
-        user_tier_level = PRICING_TIER_HIERARCHY.get(self.cost_tier)
-        if user_tier_level is None:
-            return []
-
-        # Return all tiers with level higher than user's cost tier (lower in hierarchy)
-        allowed_tiers = []
-        for tier_code, tier_level in PRICING_TIER_HIERARCHY.items():
-            if tier_level > user_tier_level:
-                allowed_tiers.append(tier_code)
+            return ALL_PRICING_TIERS
 
-        return allowed_tiers
+        # All tiers with level higher than user's cost tier (lower in hierarchy)
+        return ALLOWED_SELLING_TIERS.get(self.cost_tier, ())
 
     def can_sell_at_tier(self, tier):
         """
         Check if this user can sell at a specific pricing tier.
         """
-        return tier in self.get_allowed_selling_tiers()
+        if tier not in PRICING_TIER_CODES:
+            return False
+        if not self.cost_tier:
+            return True
+        return tier in _ALLOWED_SELLING_TIER_SETS.get(self.cost_tier, frozenset())
+
+
+class BrandQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the brands and everything that cascades from them with one
+        statement per table. The default collector loads every item, batch
+        and transaction of the brands first; none of these models has delete
+        signals to send.
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        using = self.db
+        brand_ids = list(self.values_list("pk", flat=True))
+        if not brand_ids:
+            return 0, {}
+        items = Item.objects.using(using).filter(brand__in=brand_ids)
+        transactions = Transaction.objects.using(using).filter(brand__in=brand_ids)
+        batches = ItemBatch.objects.using(using).filter(item__in=items)
+        deleted = Counter()
+
+        with transaction.atomic(using=using):
+            # Nothing references these, so each delete() is a single DELETE
+            for queryset in (
+                TransactionItem.objects.using(using).filter(
+                    Q(item__in=items) | Q(transaction__in=transactions)
+                ),
+                ItemTierPricing.objects.using(using).filter(item__in=items),
+                CustomerSpecialPricing.objects.using(using).filter(item__in=items),
+                CustomerBrandPricing.objects.using(using).filter(brand__in=brand_ids),
+            ):
+                deleted.update(queryset.delete()[1])
+
+            # SET_NULL references from rows of other brands
+            TransactionItem.objects.using(using).filter(batch__in=batches).update(
+                batch=None
+            )
+            ItemBatch.objects.using(using).filter(
+                transaction__in=transactions
+            ).update(transaction=None)
+
+            # With no references left, skip the collector entirely
+            with connections[using].cursor() as cursor:
+                for model, sql in (
+                    (
+                        ItemBatch,
+                        "DELETE FROM inventory_item_batch WHERE item_id IN "
+                        "(SELECT item_id FROM inventory_item WHERE brand_id = ANY(%s))",
+                    ),
+                    (Item, "DELETE FROM inventory_item WHERE brand_id = ANY(%s)"),
+                    (
+                        Transaction,
+                        'DELETE FROM "transaction" WHERE brand_id = ANY(%s)',
+                    ),
+                    (Brand, "DELETE FROM inventory_brand WHERE brand_id = ANY(%s)"),
+                ):
+                    cursor.execute(sql, [brand_ids])
+                    deleted[model._meta.label] = cursor.rowcount
+
+        self._result_cache = None
+        deleted = {label: count for label, count in deleted.items() if count}
+        return sum(deleted.values()), deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 # Brand model for beauty products
 class Brand(models.Model):
-    VAT_CHOICES = [
-        ("VAT", "VAT-inclusive"),
-        ("NON_VAT", "NON-VAT"),
-        ("BOTH", "Both VAT and NON-VAT"),
-    ]
+    class VatClassification(models.TextChoices):
+        VAT = "VAT", "VAT-inclusive"
+        NON_VAT = "NON_VAT", "NON-VAT"
+        BOTH = "BOTH", "Both VAT and NON-VAT"
 
-    STATUS_CHOICES = [
-        ("Active", "Active"),
-        ("Archived", "Archived"),
-    ]
+    VAT_CHOICES = VatClassification.choices
+    # Built once; get_vat_classification_display() rebuilds it per call
+    VAT_DISPLAY = MappingProxyType(dict(VAT_CHOICES))
+
+    STATUS_CHOICES = Status.choices
 
     brand_id = models.AutoField(primary_key=True)
     brand_name = models.CharField(max_length=100, unique=True)
@@ -111,24 +249,46 @@ class Brand(models.Model):
         default="VAT",
         help_text="VAT classification for tax purposes",
     )
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Active")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=Status.ACTIVE)
+
+    objects = BrandQuerySet.as_manager()
 
     class Meta:
         db_table = "inventory_brand"
         ordering = ["brand_name"]
 
     def __str__(self):
-        return f"{self.brand_name} ({self.get_vat_classification_display()})"
+        vat_display = self.VAT_DISPLAY.get(
+            self.vat_classification, self.vat_classification
+        )
+        return f"{self.brand_name} ({vat_display})"
+
+    def delete(self, using=None, keep_parents=False):
+        # Goes through BrandQuerySet.delete(), like bulk deletes do
+        using = using or router.db_for_write(Brand, instance=self)
+        deleted = Brand.objects.using(using).filter(pk=self.pk).delete()
+        self.pk = None
+        return deleted
 
 
 # Customer model for beauty distribution
 class Customer(models.Model):
-    PLATFORM_CHOICES = [
-        ("whatsapp", "WhatsApp"),
-        ("messenger", "Messenger"),
-        ("viber", "Viber"),
-        ("business_suite", "Business Suite"),
-    ]
+    class Platform(models.TextChoices):
+        WHATSAPP = "whatsapp", "WhatsApp"
+        MESSENGER = "messenger", "Messenger"
+        VIBER = "viber", "Viber"
+        BUSINESS_SUITE = "business_suite", "Business Suite"
+
+    class CustomerType(models.TextChoices):
+        INTERNATIONAL = "International", "International"
+        DISTRIBUTOR = "Distributor", "Distributor"
+        PHYSICAL_STORE = "Physical Store", "Physical Store"
+        RESELLER = "Reseller", "Reseller"
+        DIRECT_CUSTOMER = "Direct Customer", "Direct Customer"
+
+    PLATFORM_CHOICES = Platform.choices
+    # Built once; get_platform_display() rebuilds it per call
+    PLATFORM_DISPLAY = MappingProxyType(dict(PLATFORM_CHOICES))
 
     customer_id = models.AutoField(primary_key=True)
     company_name = models.CharField(max_length=100, unique=True)
@@ -137,30 +297,21 @@ class Customer(models.Model):
     contact_number = models.CharField(max_length=15)
     tin_id = models.CharField(max_length=15, null=True, blank=True)
 
-    customer_type = models.CharField(
-        max_length=20,
-        choices=[
-            ("International", "International"),
-            ("Distributor", "Distributor"),
-            ("Physical Store", "Physical Store"),
-            ("Reseller", "Reseller"),
-            ("Direct Customer", "Direct Customer"),
-        ],
-    )
+    customer_type = models.CharField(max_length=20, choices=CustomerType.choices)
 
     # Replace contact field with platform field
     platform = models.CharField(
         max_length=20,
         choices=PLATFORM_CHOICES,
-        default="whatsapp",  # Default value for migration
+        default=Platform.WHATSAPP,  # Default value for migration
         help_text="Preferred communication platform",
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(
         max_length=10,
-        choices=[("Active", "Active"), ("Archived", "Archived")],
-        default="Active",
+        choices=Status.choices,
+        default=Status.ACTIVE,
     )
 
     class Meta:
@@ -182,6 +333,11 @@ class CustomerBrandPricing(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Relations read by __str__; see DisplayQuerySet.with_str()
+    str_related_fields = ("customer", "brand")
+
+    objects = DisplayQuerySet.as_manager()
+
     class Meta:
         db_table = "customer_brand_pricing"
         unique_together = ["customer", "brand"]
@@ -189,15 +345,75 @@ class CustomerBrandPricing(models.Model):
         verbose_name_plural = "Customer Brand Pricing"
 
     def __str__(self):
-        return f"{self.customer.company_name} - {self.brand.brand_name} ({self.get_pricing_tier_display()})"
+        tier_display = PRICING_TIER_DISPLAY.get(self.pricing_tier, self.pricing_tier)
+        return f"{self.customer.company_name} - {self.brand.brand_name} ({tier_display})"
+
+    def save(self, *args, **kwargs):
+        check_pricing_tier(self.pricing_tier)
+        super().save(*args, **kwargs)
+
+
+class ItemQuerySet(models.QuerySet):
+    def with_stock(self):
+        """
+        Annotate the figure behind Item.active_batches_count so listing items
+        doesn't run an aggregate query per row. Item.total_quantity reads the
+        current_stock column and needs no annotation.
+        """
+        return self.annotate(
+            _active_batches_count=Count(
+                "batches", filter=Q(batches__remaining_quantity__gt=0)
+            ),
+        )
+
+    def for_list(self):
+        """
+        Load what ItemSerializer reads for each row: the brand, the batch
+        count and the tier prices
+        """
+        return self.select_related("brand").with_stock().prefetch_related("tier_pricing")
+
+    def last_sku_number(self, brand_id):
+        """
+        Highest item number among the brand's generated SKUs, or 0. SKUs not
+        in the generated format are ignored.
+        """
+        brand_code = brand_id + 100
+        prefix = f"{brand_code}-"
+        generated_skus = self.filter(
+            sku__startswith=prefix, sku__regex=rf"^{brand_code}-[0-9]+$"
+        )
+        return (
+            generated_skus.aggregate(
+                last=Max(Cast(Substr("sku", len(prefix) + 1), IntegerField()))
+            )["last"]
+            or 0
+        )
+
+    def bulk_generate_skus(self, brand_id, count):
+        """
+        Generate ``count`` consecutive SKUs for a brand with a single query, for
+        items created with bulk_create(), which skips Item.save()
+        """
+        last_number = self.last_sku_number(brand_id)
+        return [
+            f"{brand_id + 100}-{number:03d}"
+            for number in range(last_number + 1, last_number + count + 1)
+        ]
 
 
 # Restructured Item model
 class Item(models.Model):
-    UOM_CHOICES = [
-        ("pc", "Piece"),
-        ("pack", "Pack"),
-    ]
+    class Uom(models.TextChoices):
+        PIECE = "pc", "Piece"
+        PACK = "pack", "Pack"
+
+    UOM_CHOICES = Uom.choices
+    # Built once; get_uom_display() rebuilds it per call
+    UOM_DISPLAY = MappingProxyType(dict(UOM_CHOICES))
+
+    # How many generated SKUs to try before giving up on a unique conflict
+    SKU_SAVE_ATTEMPTS = 3
 
     item_id = models.AutoField(primary_key=True)
     brand = models.ForeignKey(
@@ -210,74 +426,119 @@ class Item(models.Model):
     uom = models.CharField(
         max_length=10,
         choices=UOM_CHOICES,
-        default="pc",
+        default=Uom.PIECE,
         help_text="Unit of Measurement",
     )
     # Remove direct quantity field - will be calculated from batches
     # quantity = models.SmallIntegerField()
+    current_stock = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text="Sum of remaining_quantity over this item's batches, kept up to date by a database trigger on inventory_item_batch.",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        # Save first to ensure we have an ID and brand relationship
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+    objects = ItemQuerySet.as_manager()
 
-        # Auto-generate SKU if not provided and this is a new item
-        if not self.sku and is_new and self.brand_id:
+    def save(self, *args, **kwargs):
+        # Auto-generate SKU if not provided and this is a new item. The SKU
+        # only depends on the brand, so it goes into the first INSERT.
+        if self.sku or self.pk is not None or not self.brand_id:
+            super().save(*args, **kwargs)
+            return
+
+        # The unique constraint on sku settles concurrent creates; the loser
+        # regenerates past the winner's number and tries again
+        for attempt in range(self.SKU_SAVE_ATTEMPTS):
             self.sku = self.generate_sku()
-            # Save again with the generated SKU
-            super().save(update_fields=["sku"])
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                sku_taken = Item.objects.filter(sku=self.sku).exists()
+                if attempt == self.SKU_SAVE_ATTEMPTS - 1 or not sku_taken:
+                    # Out of attempts, or another constraint failed
+                    self.sku = None
+                    raise
 
     def generate_sku(self):
         """Generate SKU in format: {brand_id + 100}-{item_number:03d}"""
         # Get the brand ID and add 100 for the first 3 digits
         brand_code = self.brand_id + 100
 
-        # Get the next item number for this brand
-        # Count existing items for this brand (excluding current item if updating)
-        existing_items = Item.objects.filter(brand_id=self.brand_id)
+        # Next item number is one past the highest numeric suffix in use
+        other_items = Item.objects.all()
         if self.pk:  # If this is an update, exclude the current item
-            existing_items = existing_items.exclude(pk=self.pk)
-
-        item_count = existing_items.count() + 1
-
-        # Format as 3 digits
-        item_number = f"{item_count:03d}"
-
-        # Combine to create SKU
-        sku = f"{brand_code}-{item_number}"
-
-        # Check if this SKU already exists and increment if needed
-        while (
-            Item.objects.filter(sku=sku).exclude(pk=self.pk if self.pk else 0).exists()
-        ):
-            item_count += 1
-            item_number = f"{item_count:03d}"
-            sku = f"{brand_code}-{item_number}"
+            other_items = other_items.exclude(pk=self.pk)
+        last_number = other_items.last_sku_number(self.brand_id)
 
-        return sku
+        # Format as at least 3 digits
+        return f"{brand_code}-{last_number + 1:03d}"
 
     @property
     def total_quantity(self):
         """
-        Calculates the total quantity of the item by summing the remaining quantities of all its batches.
+        Total quantity of the item across all its batches, as stored in
+        current_stock when the row was loaded.
         """
-        return self.batches.aggregate(total=Sum("remaining_quantity"))["total"] or 0
+        return self.current_stock
 
     @property
     def active_batches_count(self):
         """
         Counts the number of batches with a positive remaining quantity.
         """
+        if hasattr(self, "_active_batches_count"):  # Loaded via with_stock()
+            return self._active_batches_count
         return self.batches.filter(remaining_quantity__gt=0).count()
 
+    @cached_property
+    def tier_pricing_by_tier(self):
+        """
+        The item's ItemTierPricing rows keyed by pricing tier, read once per
+        instance (or taken from a tier_pricing prefetch)
+        """
+        return {
+            tier_pricing.pricing_tier: tier_pricing
+            for tier_pricing in self.tier_pricing.all()
+        }
+
+    def get_tier_pricing(self, tier):
+        """The item's ItemTierPricing for a pricing tier, or None"""
+        return self.tier_pricing_by_tier.get(tier)
+
     def __str__(self):
         return f"{self.item_name} ({self.sku})"
 
     class Meta:
         db_table = "inventory_item"
-        unique_together = ["item_name", "brand"]
+        constraints = [
+            # Item names are unique per brand regardless of case; the index
+            # behind this also serves case-insensitive name lookups
+            models.UniqueConstraint(
+                Lower("item_name"), "brand", name="item_name_lower_brand_uniq"
+            ),
+        ]
+        indexes = [
+            # Trigram index so admin/API "contains" searches on item_name
+            # don't have to scan the whole table
+            GinIndex(
+                name="item_name_trgm",
+                fields=["item_name"],
+                opclasses=["gin_trgm_ops"],
+            ),
+            # Item lists filter by brand and order by name
+            models.Index(name="item_brand_name_idx", fields=["brand", "item_name"]),
+            # generate_sku() matches SKUs by prefix (LIKE '101-%')
+            models.Index(
+                name="item_sku_pattern_idx",
+                fields=["sku"],
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
 
 
 class ItemBatch(models.Model):
@@ -286,7 +547,8 @@ class ItemBatch(models.Model):
     """
 
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="batches")
-    batch_number = models.PositiveIntegerField(
+    # Numbered per item, so 2 bytes is plenty
+    batch_number = models.PositiveSmallIntegerField(
         help_text="Auto-generated batch number for the item, starting from 1."
     )
     cost_price = models.DecimalField(
@@ -309,22 +571,125 @@ class ItemBatch(models.Model):
         help_text="The incoming transaction that created this batch.",
     )
 
+    # Relations read by __str__; see DisplayQuerySet.with_str()
+    str_related_fields = ("item",)
+
+    objects = DisplayQuerySet.as_manager()
+
     class Meta:
         db_table = "inventory_item_batch"
         unique_together = ["item", "batch_number"]
         ordering = ["item", "batch_number"]
         verbose_name = "Item Batch"
         verbose_name_plural = "Item Batches"
+        indexes = [
+            # Stock totals and available-batch lookups filter on
+            # remaining_quantity > 0 per item
+            models.Index(
+                name="batch_item_remaining_idx",
+                fields=["item", "remaining_quantity"],
+            ),
+            # FIFO/LIFO picking walks an item's batches that still have stock
+            # in batch_number order; empty batches never need to be indexed
+            models.Index(
+                name="batch_available_fifo_idx",
+                fields=["item", "batch_number"],
+                condition=Q(remaining_quantity__gt=0),
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(remaining_quantity__lte=F("initial_quantity")),
+                name="batch_remaining_lte_initial",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.pk:  # If this is a new batch
-            last_batch = (
-                ItemBatch.objects.filter(item=self.item)
-                .order_by("-batch_number")
-                .first()
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # New batch: lock the parent item so concurrent batches for it are
+        # numbered one at a time
+        with transaction.atomic():
+            Item.objects.select_for_update().only("pk").get(pk=self.item_id)
+            last_batch_number = ItemBatch.objects.filter(
+                item_id=self.item_id
+            ).aggregate(last=Max("batch_number"))["last"]
+            self.batch_number = (last_batch_number or 0) + 1
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def create_batches(cls, batches, batch_size=500):
+        """
+        Number and bulk insert unsaved batches, which may belong to several
+        items, using one MAX query for all of them instead of one per batch.
+        """
+        item_ids = {batch.item_id for batch in batches}
+        with transaction.atomic():
+            # Same per-item locks as save(), taken in a fixed order
+            list(
+                Item.objects.select_for_update()
+                .filter(pk__in=item_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
             )
-            self.batch_number = (last_batch.batch_number + 1) if last_batch else 1
-        super().save(*args, **kwargs)
+            last_batch_numbers = dict(
+                cls.objects.filter(item_id__in=item_ids)
+                .values("item")
+                .annotate(last=Max("batch_number"))
+                .values_list("item", "last")
+            )
+            for batch in batches:
+                batch.batch_number = last_batch_numbers.get(batch.item_id, 0) + 1
+                last_batch_numbers[batch.item_id] = batch.batch_number
+            return cls.objects.bulk_create(batches, batch_size=batch_size)
+
+    @classmethod
+    def reduce_newest_first(cls, quantities):
+        """
+        Take stock out of items' batches newest batch first, as negative
+        manual adjustments do. quantities maps item ids to the amount to
+        remove; an item with less stock than that is emptied. The batches are
+        locked and then all reduced by one UPDATE, which works out each
+        batch's share from a running total over the newer batches.
+        """
+        if not quantities:
+            return
+        item_ids = list(quantities)
+        with transaction.atomic():
+            list(
+                cls.objects.select_for_update()
+                .filter(item_id__in=item_ids, remaining_quantity__gt=0)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    WITH wanted AS (
+                        SELECT * FROM unnest(%s::int[], %s::int[])
+                            AS w(item_id, quantity)
+                    ),
+                    ranked AS (
+                        SELECT b.id, w.quantity,
+                               SUM(b.remaining_quantity) OVER (
+                                   PARTITION BY b.item_id
+                                   ORDER BY b.batch_number DESC
+                               ) - b.remaining_quantity AS taken_by_newer
+                        FROM inventory_item_batch b
+                        JOIN wanted w ON w.item_id = b.item_id
+                        WHERE b.remaining_quantity > 0
+                    )
+                    UPDATE inventory_item_batch b
+                    SET remaining_quantity = b.remaining_quantity - LEAST(
+                        b.remaining_quantity, r.quantity - r.taken_by_newer
+                    )
+                    FROM ranked r
+                    WHERE b.id = r.id AND r.taken_by_newer < r.quantity
+                    """,
+                    [item_ids, [quantities[item_id] for item_id in item_ids]],
+                )
 
     def __str__(self):
         return f"{self.item.item_name} - Batch {self.batch_number}"
@@ -348,6 +713,11 @@ class ItemTierPricing(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Relations read by __str__; see DisplayQuerySet.with_str()
+    str_related_fields = ("item",)
+
+    objects = DisplayQuerySet.as_manager()
+
     class Meta:
         db_table = "item_tier_pricing"
         unique_together = ["item", "pricing_tier"]
@@ -355,9 +725,12 @@ class ItemTierPricing(models.Model):
         verbose_name_plural = "Item Tier Pricing"
 
     def __str__(self):
-        return (
-            f"{self.item.item_name} - {self.get_pricing_tier_display()}: ₱{self.price}"
-        )
+        tier_display = PRICING_TIER_DISPLAY.get(self.pricing_tier, self.pricing_tier)
+        return f"{self.item.item_name} - {tier_display}: ₱{self.price}"
+
+    def save(self, *args, **kwargs):
+        check_pricing_tier(self.pricing_tier)
+        super().save(*args, **kwargs)
 
 
 # New model: Customer Special Pricing
@@ -375,23 +748,60 @@ class CustomerSpecialPricing(models.Model):
         Account, on_delete=models.SET_NULL, null=True, blank=True
     )
 
+    # Relations read by __str__; see DisplayQuerySet.with_str()
+    str_related_fields = ("customer", "item")
+
+    objects = DisplayQuerySet.as_manager()
+
     class Meta:
         db_table = "customer_special_pricing"
         unique_together = ["customer", "item"]
         verbose_name = "Customer Special Pricing"
         verbose_name_plural = "Customer Special Pricing"
+        constraints = [
+            models.CheckConstraint(
+                check=Q(discount__lt=0),
+                name="special_pricing_negative",
+                violation_error_message="Discount must be a negative value.",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer.company_name} - {self.item.item_name}: ₱{self.discount}"
 
 
+class TransactionQuerySet(models.QuerySet):
+    def for_list(self):
+        """
+        Join the brand, customer and account that transaction lists show by
+        name, without the customer's address text, and prefetch the line items
+        with what TransactionItemSerializer reads
+        """
+        return (
+            self.select_related("brand", "customer", "account")
+            .defer("customer__address")
+            .prefetch_related(
+                Prefetch("items", queryset=TransactionItem.objects.for_nested_list())
+            )
+        )
+
+
 # Restructured Transaction model
 class Transaction(models.Model):
-    TRANSACTION_TYPE_CHOICES = [
-        ("INCOMING", "Incoming - Stock In from Brand"),
-        ("OUTGOING", "Outgoing - Stock Out to Customer"),
-        ("ADJUSTMENT", "Manual Inventory Adjustment"),
-    ]
+    class TransactionType(models.TextChoices):
+        INCOMING = "INCOMING", "Incoming - Stock In from Brand"
+        OUTGOING = "OUTGOING", "Outgoing - Stock Out to Customer"
+        ADJUSTMENT = "ADJUSTMENT", "Manual Inventory Adjustment"
+
+    TRANSACTION_TYPE_CHOICES = TransactionType.choices
+
+    class VatType(models.TextChoices):
+        VAT = "VAT", "VAT"
+        NON_VAT = "NON_VAT", "NON-VAT"
+        MIXED = "MIXED", "Mixed"
+    # Built once; get_transaction_type_display() rebuilds it per call
+    TRANSACTION_TYPE_DISPLAY = MappingProxyType(dict(TRANSACTION_TYPE_CHOICES))
+    TRANSACTION_TYPE_CODES = frozenset(TRANSACTION_TYPE_DISPLAY)
 
     transaction_id = models.AutoField(primary_key=True)
     brand = models.ForeignKey(Brand, on_delete=models.CASCADE)
@@ -420,66 +830,201 @@ class Transaction(models.Model):
     # VAT information
     vat_type = models.CharField(
         max_length=10,
-        choices=[("VAT", "VAT"), ("NON_VAT", "NON-VAT"), ("MIXED", "Mixed")],
+        choices=VatType.choices,
         null=True,
         blank=True,
     )
 
-    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of total_price over this transaction's items, kept up to date by a database trigger on transaction_item.",
+    )
     vat_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     transacted_date = models.DateField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
     due_date = models.DateField(null=True, blank=True)
-    reference_number = models.CharField(max_length=20, null=True, blank=True)
+    # Numbered by the database on insert; see generate_reference_number()
+    reference_number = models.CharField(
+        max_length=20,
+        null=True,
+        blank=True,
+        db_default=models.Func(
+            function="next_transaction_reference", output_field=models.CharField()
+        ),
+    )
     notes = models.TextField(null=True, blank=True)
 
+    objects = TransactionQuerySet.as_manager()
+
+    # True only if all completion criteria are met. OUTGOING transactions need
+    # is_released, is_paid and is_or_sent; INCOMING and ADJUSTMENT ones are
+    # completed when created. Stored so filters on it run in SQL.
+    is_completed = models.GeneratedField(
+        expression=ExpressionWrapper(
+            ~Q(transaction_type="OUTGOING")
+            | Q(is_released=True, is_paid=True, is_or_sent=True),
+            output_field=models.BooleanField(),
+        ),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
     class Meta:
         db_table = "transaction"
+        indexes = [
+            models.Index(
+                name="txn_completed_date_idx", fields=["is_completed", "transacted_date"]
+            ),
+            # Per-brand, per-customer and per-account histories, newest first
+            models.Index(name="txn_brand_date_idx", fields=["brand", "-transacted_date"]),
+            models.Index(
+                name="txn_customer_date_idx", fields=["customer", "-transacted_date"]
+            ),
+            models.Index(name="txn_account_created_idx", fields=["account", "-created_at"]),
+            # Only unpaid transactions are ever checked for being overdue
+            models.Index(
+                name="txn_unpaid_due_idx", fields=["due_date"], condition=Q(is_paid=False)
+            ),
+            # Pending outgoing transactions (is_completed = false) are a small
+            # slice of the table
+            models.Index(
+                name="txn_pending_account_date_idx",
+                fields=["account", "transacted_date"],
+                condition=Q(is_completed=False),
+            ),
+            models.Index(
+                name="txn_type_status_idx",
+                fields=["transaction_type", "is_released", "is_paid", "is_or_sent"],
+            ),
+            # generate_reference_number() matches this year's references by
+            # prefix (LIKE '2025-%')
+            models.Index(
+                name="txn_reference_pattern_idx",
+                fields=["reference_number"],
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.get_transaction_type_display()} - {self.reference_number or self.transaction_id}"
+        type_display = self.TRANSACTION_TYPE_DISPLAY.get(
+            self.transaction_type, self.transaction_type
+        )
+        return f"{type_display} - {self.reference_number or self.transaction_id}"
 
     @property
-    def is_completed(self):
+    def transaction_status(self):
         """
-        Read-only property that returns True only if all completion criteria are met.
-        For OUTGOING transactions: is_released, is_paid, and is_or_sent must all be True.
-        For INCOMING transactions: always returns True (no additional completion criteria).
+        "Pending" for outgoing transactions that aren't fully completed,
+        "Completed" otherwise; read off the generated is_completed column.
         """
-        if self.transaction_type == "OUTGOING":
-            return self.is_released and self.is_paid and self.is_or_sent
-        return True  # INCOMING transactions are completed when created
+        return "Completed" if self.is_completed else "Pending"
 
     def save(self, *args, **kwargs):
         # Auto-generate reference number if not provided
+        adding = self._state.adding
         if not self.reference_number:
-            self.reference_number = self.generate_reference_number()
+            if adding:
+                # The INSERT takes the column default and returns the number
+                self.reference_number = DatabaseDefault()
+            else:
+                self.reference_number = self.generate_reference_number()
+                if kwargs.get("update_fields") is not None:
+                    kwargs["update_fields"] = {
+                        *kwargs["update_fields"],
+                        "reference_number",
+                    }
         super().save(*args, **kwargs)
+        if not adding:
+            # Updates don't return the generated is_completed; drop the stale
+            # value so it's reloaded on next access
+            self.__dict__.pop("is_completed", None)
+
+    @staticmethod
+    def reference_sequence_name(year):
+        """Name of the Postgres sequence numbering a year's reference numbers"""
+        return f"transaction_reference_{year}_seq"
+
+    @staticmethod
+    def last_reference_number(year):
+        """Highest NNNN among existing YEAR-NNNN reference numbers, or 0"""
+        prefix = f"{year}-"
+        return (
+            Transaction.objects.filter(
+                reference_number__startswith=prefix,
+                reference_number__regex=rf"^{year}-[0-9]+$",
+            ).aggregate(
+                last=Max(
+                    Cast(Substr("reference_number", len(prefix) + 1), IntegerField())
+                )
+            )["last"]
+            or 0
+        )
 
     def generate_reference_number(self):
         """Generate sequential reference number in format: YEAR-NNNN"""
+        # See the next_transaction_reference() function in migration 0029
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT next_transaction_reference()")
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def preview_reference_number(cls):
+        """The reference number the next transaction will most likely get"""
         current_year = timezone.now().year
+        sequence_name = cls.reference_sequence_name(current_year)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [sequence_name])
+            if cursor.fetchone()[0] is None:
+                next_number = cls.last_reference_number(current_year) + 1
+            else:
+                # Read the sequence without advancing it
+                cursor.execute(
+                    f"SELECT last_value, is_called FROM "
+                    f"{connection.ops.quote_name(sequence_name)}"
+                )
+                last_value, is_called = cursor.fetchone()
+                next_number = last_value + 1 if is_called else last_value
+
+        return f"{current_year}-{next_number:04d}"
 
-        # Get the last transaction for the current year
-        last_transaction = (
-            Transaction.objects.filter(reference_number__startswith=f"{current_year}-")
-            .order_by("-reference_number")
-            .first()
+
+class TransactionItemQuerySet(DisplayQuerySet):
+    def for_nested_list(self):
+        """
+        Load the line items shown inside a transaction list with only the
+        columns TransactionItemSerializer reads, leaving out e.g. the brand's
+        address and contact details
+        """
+        return self.select_related("item__brand", "batch").only(
+            "id",
+            "transaction",
+            "quantity",
+            "unit_price",
+            "total_price",
+            "pricing_tier",
+            "created_at",
+            "item__item_name",
+            "item__sku",
+            "item__brand__brand_name",
+            "batch__batch_number",
+            "batch__remaining_quantity",
         )
 
-        if last_transaction and last_transaction.reference_number:
-            # Extract the number part and increment
-            try:
-                last_number = int(last_transaction.reference_number.split("-")[1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
-
-        # Format as 4-digit number with leading zeros
-        return f"{current_year}-{next_number:04d}"
+    def with_quantity_change(self):
+        """
+        Annotate the figure behind TransactionItem.quantity_change so listing
+        rows doesn't compute it per row in Python
+        """
+        return self.annotate(
+            _quantity_change=Case(
+                When(transaction__transaction_type="OUTGOING", then=-F("quantity")),
+                default=F("quantity"),
+            )
+        )
 
 
 # Transaction items linking transactions to inventory items
@@ -497,7 +1042,13 @@ class TransactionItem(models.Model):
     )
     quantity = models.IntegerField()
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
-    total_price = models.DecimalField(max_digits=12, decimal_places=2)
+    # Computed by the database, so rows written with bulk_create() or
+    # update() can't disagree with quantity * unit_price
+    total_price = models.GeneratedField(
+        expression=F("quantity") * F("unit_price"),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
 
     # Pricing tier used for this transaction item
     pricing_tier = models.CharField(
@@ -510,14 +1061,40 @@ class TransactionItem(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Relations read by __str__; see DisplayQuerySet.with_str()
+    str_related_fields = ("transaction", "item")
+
+    objects = TransactionItemQuerySet.as_manager()
+
     class Meta:
         db_table = "transaction_item"
         # Removed unique_together to allow same item multiple times with different batches
+        constraints = [
+            models.CheckConstraint(check=~Q(quantity=0), name="txn_item_qty_nonzero"),
+        ]
+        indexes = [
+            # An item's transaction history, newest first
+            models.Index(name="txn_item_item_created_idx", fields=["item", "-created_at"]),
+        ]
 
     def __str__(self):
         return f"{self.transaction} - {self.item.item_name} (Qty: {self.quantity})"
 
+    @property
+    def quantity_change(self):
+        """Quantity with the stock direction: negative for OUTGOING transactions"""
+        if hasattr(self, "_quantity_change"):
+            return self._quantity_change
+        if self.transaction.transaction_type == "OUTGOING":
+            return -self.quantity
+        return self.quantity
+
     def save(self, *args, **kwargs):
-        """Auto-calculate total_price on save"""
-        self.total_price = self.quantity * self.unit_price
+        if self.pricing_tier:
+            check_pricing_tier(self.pricing_tier)
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if not adding:
+            # Inserts return the generated total_price but updates don't;
+            # drop the stale value so it's reloaded on next access
+            self.__dict__.pop("total_price", None)
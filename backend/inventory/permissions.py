@@ -1,5 +1,14 @@
+import logging
+
 from rest_framework import permissions
 
+logger = logging.getLogger(__name__)
+
+# Role groups checked by the permissions below
+MANAGER_ROLES = frozenset({'Inventory Manager'})
+STAFF_ROLES = frozenset({'Inventory Manager', 'Warehouse Staff'})
+RESERVE_ROLES = frozenset({'Inventory Manager', 'Warehouse Staff', 'Sales'})
+
 class IsInventoryManager(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.role == 'Inventory Manager'
@@ -14,23 +23,23 @@ class IsSales(permissions.BasePermission):
 
 class CanManageBrands(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role in ['Inventory Manager']
+        return request.user.role in MANAGER_ROLES
 
 class CanManageItems(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff']
+        return request.user.role in STAFF_ROLES
 
 class CanManageTransactions(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff']
+        return request.user.role in STAFF_ROLES
 
 class CanApproveTransactions(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff']
+        return request.user.role in STAFF_ROLES
 
 class CanViewAlerts(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff']
+        return request.user.role in STAFF_ROLES
 
 class CanExportData(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -42,7 +51,7 @@ class CanViewDashboard(permissions.BasePermission):
 
 class CanReserveGoods(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff', 'Sales']
+        return request.user.role in RESERVE_ROLES
 
 class CanViewOwnTransactions(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -58,7 +67,7 @@ class ReadOnlyOrCanManageItems(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return request.user and request.user.is_authenticated
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff']
+        return request.user.role in STAFF_ROLES
 
 class ReadOnlyOrCanManageBrands(permissions.BasePermission):
     """
@@ -76,14 +85,17 @@ class ReadOnlyOrCanManageTransactions(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return request.user and request.user.is_authenticated
-        return request.user.role in ['Inventory Manager', 'Warehouse Staff'] 
+        return request.user.role in STAFF_ROLES 
 
 class CanCancelOwnPendingTransaction(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        print('DEBUG: user', request.user)
-        print('DEBUG: user.role', getattr(request.user, 'role', None))
-        print('DEBUG: obj.transaction_status', getattr(obj, 'transaction_status', None))
-        if request.user.role in ['Inventory Manager', 'Warehouse Staff']:
+        logger.debug(
+            'user=%s role=%s transaction_status=%s',
+            request.user,
+            getattr(request.user, 'role', None),
+            getattr(obj, 'transaction_status', None),
+        )
+        if request.user.role in STAFF_ROLES:
             return True
         if request.user.role == 'Sales' and obj.transaction_status == 'Pending':
             return True
@@ -1,5 +1,8 @@
+from collections import Counter
 from rest_framework import serializers
 from .models import (
+    check_pricing_tier,
+    PRICING_TIER_DISPLAY,
     Item,
     Brand,
     Customer,
@@ -11,11 +14,117 @@ from .models import (
     CustomerSpecialPricing,
     ItemBatch,
 )
+from .services import PricingService
+from django.db import transaction as db_transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.db.models.functions import Lower
+from django.db.models.manager import BaseManager
 from django.utils import timezone
+from django.utils.functional import cached_property
+import copy
 import pytz
+from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+
+# Looked up once rather than for every serialized row
+PH_TZ = pytz.timezone("Asia/Manila")
+DATETIME_FORMAT = "%B %d, %Y, %I:%M %p"
+DATE_FORMAT = "%B %d, %Y"
+
+
+@lru_cache(maxsize=4096)
+def _format_ph_minute(minute):
+    return datetime.fromtimestamp(minute * 60, PH_TZ).strftime(DATETIME_FORMAT)
+
+
+def format_ph_datetime(value):
+    """
+    Format an aware datetime in Manila time with DATETIME_FORMAT. The format
+    stops at minutes, so results are cached per minute; rows created together
+    share one conversion.
+    """
+    return _format_ph_minute(int(value.timestamp()) // 60)
+
+# Frontend transaction type names and the backend types they map to
+TRANSACTION_TYPE_MAP = MappingProxyType(
+    {
+        "Receive goods": "INCOMING",
+        "Receive Products": "INCOMING",
+        "Receive Products (from Brands)": "INCOMING",
+        "INCOMING": "INCOMING",
+        "Dispatch goods": "OUTGOING",
+        "Reserve goods": "OUTGOING",
+        "Return goods": "OUTGOING",
+        "Sell Products (to Customers)": "OUTGOING",
+        "OUTGOING": "OUTGOING",
+        "Manual correction": "ADJUSTMENT",
+        "Manual Adjustment": "ADJUSTMENT",
+        "Adjust Inventory": "ADJUSTMENT",
+        "ADJUSTMENT": "ADJUSTMENT",
+        "Sale": "OUTGOING",
+    }
+)
+
+
+class CachedFieldsSerializerMixin:
+    """
+    Builds a serializer class's fields once and hands each instance copies.
+
+    ModelSerializer.get_fields() introspects the model and deep-copies the
+    declared fields every time a serializer is created. Plain fields are
+    shallow-copied from the cache; nested serializers are deep-copied so
+    each one binds to its own parent and sees that parent's context.
+    """
+
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        fields = self._fields_cache.get(cls)
+        if fields is None:
+            fields = self._fields_cache[cls] = super().get_fields()
+        return {
+            name: copy.deepcopy(field)
+            if isinstance(field, serializers.BaseSerializer)
+            else copy.copy(field)
+            for name, field in fields.items()
+        }
+
+
+class ChoiceDisplayField(serializers.ReadOnlyField):
+    """
+    The display label of a choices field, looked up in a mapping built once
+    at import rather than through the model's get_FOO_display(), which
+    rebuilds the choices dict for every row.
+    """
+
+    def __init__(self, display, **kwargs):
+        self.display = display
+        super().__init__(**kwargs)
+
+    def __deepcopy__(self, memo):
+        # The mapping is shared and read-only, so it isn't copied
+        return self.__class__(self.display, **copy.deepcopy(self._kwargs, memo))
 
+    def to_representation(self, value):
+        return self.display.get(value, value)
 
-class AccountSerializer(serializers.ModelSerializer):
+
+class PrefetchingListSerializer(serializers.ListSerializer):
+    """
+    Loads the relations named in the child serializer's Meta.prefetch_lookups
+    for all rows at once before serializing them. Relations that are already
+    loaded, e.g. by the model's for_list() queryset, aren't fetched again.
+    """
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, BaseManager) else data)
+        prefetch_related_objects(rows, *self.child.Meta.prefetch_lookups)
+        return super().to_representation(rows)
+
+
+class AccountSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Account
         fields = [
@@ -30,52 +139,103 @@ class AccountSerializer(serializers.ModelSerializer):
         read_only_fields = ["account_id"]
 
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Brand
-        fields = "__all__"
+        fields = [
+            "brand_id",
+            "brand_name",
+            "street_number",
+            "street_name",
+            "city",
+            "barangay",
+            "region",
+            "postal_code",
+            "tin",
+            "landline_number",
+            "contact_person",
+            "mobile_number",
+            "email",
+            "vat_classification",
+            "status",
+        ]
         read_only_fields = ["brand_id"]
 
 
-class CustomerSerializer(serializers.ModelSerializer):
-    platform_display = serializers.CharField(
-        source="get_platform_display", read_only=True
-    )
+class CustomerSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
+    platform_display = ChoiceDisplayField(Customer.PLATFORM_DISPLAY, source="platform")
 
     class Meta:
         model = Customer
-        fields = "__all__"
+        fields = [
+            "customer_id",
+            "platform_display",
+            "company_name",
+            "contact_person",
+            "address",
+            "contact_number",
+            "tin_id",
+            "customer_type",
+            "platform",
+            "created_at",
+            "status",
+        ]
         read_only_fields = ["customer_id", "created_at"]
 
 
-class CustomerBrandPricingSerializer(serializers.ModelSerializer):
+class CustomerBrandPricingSerializer(
+    CachedFieldsSerializerMixin, serializers.ModelSerializer
+):
     customer_name = serializers.CharField(
         source="customer.company_name", read_only=True
     )
     brand_name = serializers.CharField(source="brand.brand_name", read_only=True)
-    pricing_tier_display = serializers.CharField(
-        source="get_pricing_tier_display", read_only=True
+    pricing_tier_display = ChoiceDisplayField(
+        PRICING_TIER_DISPLAY, source="pricing_tier"
     )
 
     class Meta:
         model = CustomerBrandPricing
-        fields = "__all__"
+        fields = [
+            "id",
+            "customer_name",
+            "brand_name",
+            "pricing_tier_display",
+            "pricing_tier",
+            "created_at",
+            "updated_at",
+            "customer",
+            "brand",
+        ]
         read_only_fields = ["created_at", "updated_at"]
 
 
-class ItemTierPricingSerializer(serializers.ModelSerializer):
+class ItemTierPricingSerializer(
+    CachedFieldsSerializerMixin, serializers.ModelSerializer
+):
     item_name = serializers.CharField(source="item.item_name", read_only=True)
-    pricing_tier_display = serializers.CharField(
-        source="get_pricing_tier_display", read_only=True
+    pricing_tier_display = ChoiceDisplayField(
+        PRICING_TIER_DISPLAY, source="pricing_tier"
     )
 
     class Meta:
         model = ItemTierPricing
-        fields = "__all__"
+        fields = [
+            "id",
+            "item_name",
+            "pricing_tier_display",
+            "pricing_tier",
+            "price",
+            "created_at",
+            "updated_at",
+            "item",
+        ]
         read_only_fields = ["created_at", "updated_at"]
 
 
-class CustomerSpecialPricingSerializer(serializers.ModelSerializer):
+class CustomerSpecialPricingSerializer(
+    CachedFieldsSerializerMixin, serializers.ModelSerializer
+):
     customer_name = serializers.CharField(
         source="customer.company_name", read_only=True
     )
@@ -83,11 +243,28 @@ class CustomerSpecialPricingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomerSpecialPricing
-        fields = "__all__"
+        fields = [
+            "id",
+            "customer_name",
+            "item_name",
+            "discount",
+            "created_at",
+            "updated_at",
+            "customer",
+            "item",
+            "created_by",
+        ]
         read_only_fields = ["created_at", "updated_at"]
 
+    def validate_discount(self, value):
+        # Checked here so updates get a 400 too, rather than hitting the
+        # special_pricing_negative constraint
+        if not PricingService.validate_special_pricing_discount(value):
+            raise serializers.ValidationError("Discount must be negative")
+        return value
+
 
-class ItemBatchSerializer(serializers.ModelSerializer):
+class ItemBatchSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     item_name = serializers.CharField(source="item.item_name", read_only=True)
     item_sku = serializers.CharField(source="item.sku", read_only=True)
     brand_name = serializers.CharField(source="item.brand.brand_name", read_only=True)
@@ -98,29 +275,45 @@ class ItemBatchSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ItemBatch
-        fields = "__all__"
+        fields = [
+            "id",
+            "item_name",
+            "item_sku",
+            "brand_name",
+            "transaction_reference",
+            "created_at_formatted",
+            "batch_number",
+            "cost_price",
+            "initial_quantity",
+            "remaining_quantity",
+            "created_at",
+            "item",
+            "transaction",
+        ]
         read_only_fields = ["batch_number", "created_at"]
 
     def get_created_at_formatted(self, obj):
-        ph_tz = pytz.timezone("Asia/Manila")
-        ph_datetime = obj.created_at.astimezone(ph_tz)
-        return ph_datetime.strftime("%B %d, %Y, %I:%M %p")
+        return format_ph_datetime(obj.created_at)
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     brand_name = serializers.CharField(source="brand.brand_name", read_only=True)
     brand_id = serializers.IntegerField(source="brand.brand_id", read_only=True)
-    uom_display = serializers.CharField(source="get_uom_display", read_only=True)
+    uom_display = ChoiceDisplayField(Item.UOM_DISPLAY, source="uom")
 
     # Batch-based quantity fields
-    total_quantity = serializers.ReadOnlyField()
-    active_batches_count = serializers.ReadOnlyField()
+    # Both are read straight off the row: current_stock is kept by a trigger
+    # and the batch count is annotated by Item.objects.with_stock()
+    total_quantity = serializers.IntegerField(source="current_stock", read_only=True)
+    active_batches_count = serializers.IntegerField(read_only=True)
 
     # Pricing information from new structure
     tier_pricing = ItemTierPricingSerializer(many=True, read_only=True)
 
     class Meta:
         model = Item
+        list_serializer_class = PrefetchingListSerializer
+        prefetch_lookups = ("brand", "tier_pricing")
         fields = [
             "item_id",
             "brand",
@@ -147,41 +340,69 @@ class ItemSerializer(serializers.ModelSerializer):
             "active_batches_count",
         ]
 
+    def validate(self, data):
+        """Item names must be unique per brand, ignoring case"""
+        item_name = data.get("item_name", getattr(self.instance, "item_name", None))
+        brand = data.get("brand", getattr(self.instance, "brand", None))
+        if item_name and brand:
+            duplicates = Item.objects.annotate(lower_name=Lower("item_name")).filter(
+                lower_name=item_name.lower(), brand=brand
+            )
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError(
+                    "An item with this name already exists for this brand."
+                )
+        return data
+
 
-class TransactionItemSerializer(serializers.ModelSerializer):
+class TransactionItemSerializer(
+    CachedFieldsSerializerMixin, serializers.ModelSerializer
+):
     item_name = serializers.CharField(source="item.item_name", read_only=True)
     sku = serializers.CharField(source="item.sku", read_only=True)
     brand_name = serializers.CharField(source="item.brand.brand_name", read_only=True)
-    quantity_change = serializers.SerializerMethodField()
+    quantity_change = serializers.ReadOnlyField()
     batch_number = serializers.IntegerField(source="batch.batch_number", read_only=True)
     batch_remaining_quantity = serializers.IntegerField(
         source="batch.remaining_quantity", read_only=True
     )
+    # Generated column; declared so it still renders as a decimal string
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = TransactionItem
-        fields = "__all__"
-
-    def get_quantity_change(self, obj):
-        """Return quantity with correct sign based on transaction type"""
-        if obj.transaction.transaction_type == "OUTGOING":
-            # Outgoing transactions should show negative quantities
-            return -obj.quantity
-        else:
-            # Incoming and adjustment transactions show positive quantities
-            return obj.quantity
+        fields = [
+            "id",
+            "item_name",
+            "sku",
+            "brand_name",
+            "quantity_change",
+            "batch_number",
+            "batch_remaining_quantity",
+            "total_price",
+            "quantity",
+            "unit_price",
+            "pricing_tier",
+            "created_at",
+            "transaction",
+            "item",
+            "batch",
+        ]
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     brand_name = serializers.CharField(source="brand.brand_name", read_only=True)
     customer_name = serializers.CharField(
         source="customer.company_name", read_only=True
     )
-    account_username = serializers.CharField(source="account.username", read_only=True)
     created_by = serializers.CharField(source="account.username", read_only=True)
 
     # Map new structure to old frontend expectations
-    transaction_status = serializers.SerializerMethodField()
+    transaction_status = serializers.CharField(read_only=True)
     transaction_type = serializers.SerializerMethodField()
     priority_status = serializers.SerializerMethodField()
 
@@ -192,59 +413,89 @@ class TransactionSerializer(serializers.ModelSerializer):
     is_completed = serializers.ReadOnlyField()
 
     # Format dates with Philippine timezone
-    transacted_date_formatted = serializers.SerializerMethodField()
+    # A plain date has no time of day to convert to Manila time
+    transacted_date_formatted = serializers.DateField(
+        source="transacted_date", format=DATE_FORMAT, read_only=True
+    )
     created_at_formatted = serializers.SerializerMethodField()
 
     class Meta:
         model = Transaction
-        fields = "__all__"
-        read_only_fields = ["transaction_id", "transacted_date", "created_at"]
-
-    def get_transaction_status(self, obj):
-        """Map the new boolean fields to old status format"""
-        if obj.transaction_type in ["INCOMING", "ADJUSTMENT"]:
-            return (
-                "Completed"  # INCOMING and ADJUSTMENT transactions are always completed
-            )
-        else:  # OUTGOING
-            if obj.is_completed:
-                return "Completed"
-            else:
-                return "Pending"
+        fields = [
+            "transaction_id",
+            "brand_name",
+            "customer_name",
+            "created_by",
+            "transaction_status",
+            "transaction_type",
+            "priority_status",
+            "items",
+            "is_completed",
+            "transacted_date_formatted",
+            "created_at_formatted",
+            "is_released",
+            "is_paid",
+            "is_or_sent",
+            "vat_type",
+            "total_amount",
+            "vat_amount",
+            "transacted_date",
+            "created_at",
+            "due_date",
+            "reference_number",
+            "notes",
+            "brand",
+            "customer",
+            "account",
+        ]
+        read_only_fields = [
+            "transaction_id",
+            "transacted_date",
+            "created_at",
+            "total_amount",
+        ]
+        list_serializer_class = PrefetchingListSerializer
+        prefetch_lookups = (
+            "brand",
+            "customer",
+            "account",
+            Prefetch("items", queryset=TransactionItem.objects.for_nested_list()),
+        )
 
     def get_transaction_type(self, obj):
         """Map the backend transaction types to frontend display format"""
-        if obj.transaction_type == "INCOMING":
-            return "INCOMING"
-        elif obj.transaction_type == "OUTGOING":
-            return "OUTGOING"
-        else:  # ADJUSTMENT
-            return "ADJUSTMENT"
+        # Legacy type names are reported as ADJUSTMENT
+        if obj.transaction_type in Transaction.TRANSACTION_TYPE_CODES:
+            return obj.transaction_type
+        return "ADJUSTMENT"
+
+    @cached_property
+    def today(self):
+        """
+        Today's date, read once per serializer. A many=True list shares one
+        child serializer, so every row is compared against the same date.
+        """
+        return timezone.localdate()
 
     def get_priority_status(self, obj):
         """Return priority status for pending transactions"""
-        if obj.transaction_type == "OUTGOING" and not obj.is_completed:
-            if obj.due_date:
-                from django.utils import timezone
-
-                if obj.due_date < timezone.now().date():
-                    return "Critical"  # Overdue
-                elif (obj.due_date - timezone.now().date()).days <= 3:
-                    return "Urgent"  # Due soon
-            return "Normal"
-        return None
+        # Only pending OUTGOING transactions have a priority; is_completed is
+        # true for every other type
+        if obj.is_completed:
+            return None
 
-    def get_transacted_date_formatted(self, obj):
-        ph_tz = pytz.timezone("Asia/Manila")
-        ph_date = timezone.make_aware(
-            timezone.datetime.combine(obj.transacted_date, timezone.datetime.min.time())
-        ).astimezone(ph_tz)
-        return ph_date.strftime("%B %d, %Y")
+        due_date = obj.due_date
+        if not due_date:
+            return "Normal"
+        days_left = (due_date - self.today).days
+        if days_left < 0:
+            return "Critical"  # Overdue
+        if days_left <= 3:
+            return "Urgent"  # Due soon
+        return "Normal"
 
     def get_created_at_formatted(self, obj):
-        ph_tz = pytz.timezone("Asia/Manila")
-        ph_datetime = obj.created_at.astimezone(ph_tz)
-        return ph_datetime.strftime("%B %d, %Y, %I:%M %p")
+        return format_ph_datetime(obj.created_at)
 
 
 class TransactionCreateSerializer(serializers.ModelSerializer):
@@ -268,31 +519,51 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
 
     def validate_transaction_type(self, value):
         """Map frontend transaction types to backend types"""
-        mapping = {
-            "Receive goods": "INCOMING",
-            "Receive Products": "INCOMING",
-            "Receive Products (from Brands)": "INCOMING",
-            "INCOMING": "INCOMING",
-            "Dispatch goods": "OUTGOING",
-            "Reserve goods": "OUTGOING",
-            "Return goods": "OUTGOING",
-            "Sell Products (to Customers)": "OUTGOING",
-            "OUTGOING": "OUTGOING",
-            "Manual correction": "ADJUSTMENT",
-            "Manual Adjustment": "ADJUSTMENT",
-            "Adjust Inventory": "ADJUSTMENT",
-            "ADJUSTMENT": "ADJUSTMENT",
-            "Sale": "OUTGOING",
-        }
-
-        mapped_type = mapping.get(value, value)
-        if mapped_type not in ["INCOMING", "OUTGOING", "ADJUSTMENT"]:
+        mapped_type = TRANSACTION_TYPE_MAP.get(value, value)
+        if mapped_type not in Transaction.TRANSACTION_TYPE_CODES:
             raise serializers.ValidationError(f"Invalid transaction type: {value}")
 
         # Store the original type for later use
         self.original_transaction_type = value
         return mapped_type
 
+    def validate_items(self, value):
+        """
+        Resolve the alternative keys the frontend may send for each line once,
+        so create() reads a single key per value
+        """
+        lines = []
+        for item_data in value:
+            # Handle both 'item' and 'item_id' keys from frontend
+            item_id = item_data.get("item") or item_data.get("item_id")
+            batch_id = item_data.get("batch_id")
+            try:
+                item_id = int(item_id) if item_id else None
+                batch_id = int(batch_id) if batch_id else None
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(
+                    f"Invalid item or batch ID in line: {item_data}"
+                )
+            # Keep the sign for correct stock calculation
+            quantity_change = item_data.get("quantity_change") or item_data.get(
+                "quantity", 0
+            )
+            # create() skips lines without an item; any other line becomes a
+            # TransactionItem, whose quantity can't be zero
+            if item_id and not quantity_change:
+                raise serializers.ValidationError(
+                    f"A non-zero quantity is required in line: {item_data}"
+                )
+            lines.append(
+                {
+                    **item_data,
+                    "item_id": item_id,
+                    "batch_id": batch_id,
+                    "quantity_change": quantity_change,
+                }
+            )
+        return lines
+
     def validate(self, data):
         """Additional validation"""
         print("🔍 TransactionCreateSerializer.validate() called")
@@ -331,6 +602,31 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
         print("✅ Validation passed")
         return data
 
+    def get_fallback_brand_id(self, is_adjustment, items_data, items):
+        """
+        The brand for a transaction sent without one: for a manual adjustment
+        its first item's brand (read from the already loaded items), otherwise
+        the first available brand. Runs at most one query.
+        """
+        if is_adjustment and items_data:
+            item = items.get(items_data[0]["item_id"])
+            if item is not None:
+                return item.brand_id
+
+        return Brand.objects.values_list("pk", flat=True).first()
+
+    @staticmethod
+    def save_batch_changes(new_batches, reductions):
+        """
+        Write batch changes collected from the lines. Every pending reduction
+        came from a line before the pending new batches of its item, so the
+        reductions are applied first and can't take from those batches.
+        """
+        ItemBatch.reduce_newest_first(reductions)
+        if new_batches:
+            ItemBatch.create_batches(new_batches)
+
+    @db_transaction.atomic
     def create(self, validated_data):
         print("🔍 TransactionCreateSerializer.create() called")
         print("📋 Raw validated_data:", validated_data)
@@ -370,175 +666,188 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
             or validated_data.get("transaction_type") == "ADJUSTMENT"
         )
 
-        if is_adjustment and not validated_data.get("brand"):
-            if items_data:
-                first_item_id = items_data[0].get("item") or items_data[0].get(
-                    "item_id"
-                )
-                if first_item_id:
-                    try:
-                        item = Item.objects.get(pk=first_item_id)
-                        validated_data["brand"] = item.brand
-                    except Item.DoesNotExist:
-                        # Use first available brand as fallback
-                        first_brand = Brand.objects.first()
-                        if first_brand:
-                            validated_data["brand"] = first_brand
+        # Read every referenced item, and for sales every batch, in one query
+        # each rather than once per line
+        items = Item.objects.in_bulk(
+            {item_data["item_id"] for item_data in items_data if item_data["item_id"]}
+        )
 
         # Ensure we have a brand for all transactions
         if not validated_data.get("brand"):
-            first_brand = Brand.objects.first()
-            if first_brand:
-                validated_data["brand"] = first_brand
+            validated_data.pop("brand", None)
+            brand_id = self.get_fallback_brand_id(is_adjustment, items_data, items)
+            if brand_id:
+                validated_data["brand_id"] = brand_id
 
         print("🏗️ Creating transaction with data:", validated_data)
         transaction = Transaction.objects.create(**validated_data)
         print(f"✅ Transaction created: {transaction.transaction_id}")
 
-        # Create transaction items
+        batches = {}
+        if transaction.transaction_type == "OUTGOING":
+            # Lock the batches being sold from until this transaction commits,
+            # in a fixed order, so their quantities can be checked and
+            # updated in memory
+            batches = ItemBatch.objects.select_for_update().order_by("pk").in_bulk(
+                {
+                    item_data["batch_id"]
+                    for item_data in items_data
+                    if item_data["batch_id"]
+                }
+            )
+
+        # Rows are collected here and written in bulk after the loop
+        transaction_items = []
+        new_batches = []
+        sold_batches = set()
+        adjustment_reductions = Counter()
+        # Items with a positive adjustment among new_batches
+        adjusted_item_ids = set()
+
         for i, item_data in enumerate(items_data):
             print(f"🔍 Processing item {i + 1}/{len(items_data)}: {item_data}")
 
-            # Handle both 'item' and 'item_id' keys from frontend
-            item_id = item_data.get("item") or item_data.get("item_id")
-            if item_id:
-                try:
-                    item = Item.objects.get(pk=item_id)
-                    print(f"📦 Found item: {item.item_name}")
-
-                    # Get quantity_change - preserve the sign for correct stock calculation
-                    quantity_change = item_data.get("quantity_change") or item_data.get(
-                        "quantity", 0
-                    )
-                    quantity = abs(
-                        quantity_change
-                    )  # Absolute value for transaction item record
+            item_id = item_data["item_id"]
+            if not item_id:
+                continue
+
+            item = items.get(item_id)
+            if item is None:
+                print(f"❌ Item with ID {item_id} does not exist, skipping...")
+                continue
+            print(f"📦 Found item: {item.item_name}")
+
+            # quantity_change keeps the sign for correct stock calculation
+            quantity_change = item_data["quantity_change"]
+            quantity = abs(quantity_change)  # Absolute value for transaction item record
+            print(f"📊 Quantity: {quantity} (from quantity_change: {quantity_change})")
+
+            # Get cost_price for incoming transactions or unit_price for others
+            if transaction.transaction_type == "INCOMING":
+                # For incoming transactions, use cost_price from frontend
+                unit_price = item_data.get("cost_price", 0)
+                print(f"💰 Using cost_price for INCOMING: {unit_price}")
+            else:
+                # For outgoing/adjustment transactions, use unit_price
+                unit_price = item_data.get("unit_price", 0)
+                print(
+                    f"💰 Using unit_price for {transaction.transaction_type}: {unit_price}"
+                )
+
+            # Get batch information for outgoing transactions
+            batch = None
+            if transaction.transaction_type == "OUTGOING":
+                batch_id = item_data["batch_id"]
+                print(f"🗃️ Looking for batch_id: {batch_id}")
+
+                if batch_id:
+                    batch = batches.get(batch_id)
+                    if batch is None:
+                        error_msg = f"Batch with ID {batch_id} does not exist."
+                        print(f"❌ Batch not found: {error_msg}")
+                        raise serializers.ValidationError(error_msg)
                     print(
-                        f"📊 Quantity: {quantity} (from quantity_change: {quantity_change})"
+                        f"✅ Found batch: {batch.batch_number} with {batch.remaining_quantity} available"
                     )
 
-                    # Get cost_price for incoming transactions or unit_price for others
-                    if transaction.transaction_type == "INCOMING":
-                        # For incoming transactions, use cost_price from frontend
-                        unit_price = item_data.get("cost_price", 0)
-                        print(f"💰 Using cost_price for INCOMING: {unit_price}")
-                    else:
-                        # For outgoing/adjustment transactions, use unit_price
-                        unit_price = item_data.get("unit_price", 0)
-                        print(
-                            f"💰 Using unit_price for {transaction.transaction_type}: {unit_price}"
+                    # Validate that there's enough quantity in the batch, less
+                    # what earlier lines already took from it
+                    if batch.remaining_quantity < quantity:
+                        error_msg = (
+                            f"Insufficient quantity in batch {batch.batch_number}. "
+                            f"Available: {batch.remaining_quantity}, Requested: {quantity}"
                         )
+                        print(f"❌ Batch quantity error: {error_msg}")
+                        raise serializers.ValidationError(error_msg)
+
+                    # For outgoing transactions, use the batch cost price if no unit_price provided
+                    if not unit_price:
+                        unit_price = batch.cost_price
+                        print(f"💰 Using batch cost price as unit_price: {unit_price}")
+                else:
+                    print("ℹ️ No batch_id provided for OUTGOING transaction")
+
+            pricing_tier = item_data.get("pricing_tier")
+            print(f"🏷️ Pricing tier: {pricing_tier}")
+            # bulk_create() skips TransactionItem.save(), which checks this
+            if pricing_tier:
+                check_pricing_tier(pricing_tier)
+
+            transaction_items.append(
+                TransactionItem(
+                    transaction=transaction,
+                    item=item,
+                    batch=batch,
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    pricing_tier=pricing_tier,
+                )
+            )
 
-                    # Get batch information for outgoing transactions
-                    batch = None
-                    if transaction.transaction_type == "OUTGOING":
-                        batch_id = item_data.get("batch_id")
-                        print(f"🗃️ Looking for batch_id: {batch_id}")
-
-                        if batch_id:
-                            try:
-                                batch = ItemBatch.objects.get(pk=batch_id)
-                                print(
-                                    f"✅ Found batch: {batch.batch_number} with {batch.remaining_quantity} available"
-                                )
-
-                                # Validate that there's enough quantity in the batch
-                                if batch.remaining_quantity < quantity:
-                                    error_msg = (
-                                        f"Insufficient quantity in batch {batch.batch_number}. "
-                                        f"Available: {batch.remaining_quantity}, Requested: {quantity}"
-                                    )
-                                    print(f"❌ Batch quantity error: {error_msg}")
-                                    raise serializers.ValidationError(error_msg)
-
-                                # For outgoing transactions, use the batch cost price if no unit_price provided
-                                if not unit_price and batch:
-                                    unit_price = batch.cost_price
-                                    print(
-                                        f"💰 Using batch cost price as unit_price: {unit_price}"
-                                    )
-                            except ItemBatch.DoesNotExist:
-                                error_msg = f"Batch with ID {batch_id} does not exist."
-                                print(f"❌ Batch not found: {error_msg}")
-                                raise serializers.ValidationError(error_msg)
-                        else:
-                            print("ℹ️ No batch_id provided for OUTGOING transaction")
-
-                    # Calculate total price
-                    total_price = item_data.get("total_price", quantity * unit_price)
-                    print(f"💵 Total price: {total_price}")
-                    print(f"🏷️ Pricing tier: {item_data.get('pricing_tier')}")
-
-                    transaction_item = TransactionItem.objects.create(
-                        transaction=transaction,
+            # Handle batch logic based on transaction type
+            if transaction.transaction_type == "INCOMING":
+                # Create a new batch for incoming items with proper cost_price
+                new_batches.append(
+                    ItemBatch(
                         item=item,
-                        batch=batch,
-                        quantity=quantity,
-                        unit_price=unit_price,
-                        total_price=total_price,
-                        pricing_tier=item_data.get("pricing_tier"),
+                        cost_price=item_data.get("cost_price", 0),
+                        initial_quantity=quantity,
+                        remaining_quantity=quantity,
+                        transaction=transaction,
                     )
-                    print(f"✅ Created TransactionItem: {transaction_item.id}")
-
-                    # Handle batch logic based on transaction type
-                    if transaction.transaction_type == "INCOMING":
-                        # Create a new batch for incoming items with proper cost_price
-                        cost_price = item_data.get("cost_price", 0)
+                )
 
-                        # Let the model auto-generate the batch number
-                        ItemBatch.objects.create(
+            elif transaction.transaction_type == "OUTGOING" and batch:
+                # Reduce the batch quantity for outgoing items; written below
+                batch.remaining_quantity -= quantity
+                sold_batches.add(batch)
+
+            elif is_adjustment:
+                # For manual adjustments, we need to handle differently
+                # For positive adjustments, create a new batch
+                # For negative adjustments, reduce from the newest batches (LIFO)
+                if quantity_change > 0:
+                    new_batches.append(
+                        ItemBatch(
                             item=item,
-                            cost_price=cost_price,
+                            cost_price=unit_price
+                            or 0,  # Use provided price or 0 for adjustments
                             initial_quantity=quantity,
                             remaining_quantity=quantity,
                             transaction=transaction,
                         )
+                    )
+                    adjusted_item_ids.add(item.pk)
+                else:
+                    # Lines apply in order, so a reduction after a positive
+                    # line for the same item can take from the batch that
+                    # line added; write what is pending before going on
+                    if item.pk in adjusted_item_ids:
+                        self.save_batch_changes(new_batches, adjustment_reductions)
+                        new_batches = []
+                        adjustment_reductions = Counter()
+                        adjusted_item_ids = set()
+                    adjustment_reductions[item.pk] += quantity
+
+        # total_price is computed by the database and returned by the INSERT
+        for transaction_item in TransactionItem.objects.bulk_create(
+            transaction_items, batch_size=500
+        ):
+            print(
+                f"✅ Created TransactionItem: {transaction_item.id} "
+                f"(total price: {transaction_item.total_price})"
+            )
+
+        # The sold batches are locked, so their new quantities can be written
+        # as they are
+        if sold_batches:
+            ItemBatch.objects.bulk_update(
+                sold_batches, ["remaining_quantity"], batch_size=500
+            )
 
-                    elif transaction.transaction_type == "OUTGOING" and batch:
-                        # Reduce the batch quantity for outgoing items
-                        batch.remaining_quantity -= quantity
-                        batch.save()
-
-                    elif is_adjustment:
-                        # For manual adjustments, we need to handle differently
-                        # For positive adjustments, create a new batch
-                        # For negative adjustments, reduce from the newest batches (LIFO)
-                        if quantity_change > 0:
-                            # Positive adjustment - create new batch
-                            ItemBatch.objects.create(
-                                item=item,
-                                cost_price=unit_price
-                                or 0,  # Use provided price or 0 for adjustments
-                                initial_quantity=quantity,
-                                remaining_quantity=quantity,
-                                transaction=transaction,
-                            )
-                        else:
-                            # Negative adjustment - reduce from existing batches (LIFO)
-                            remaining_to_reduce = quantity
-                            batches = ItemBatch.objects.filter(
-                                item=item, remaining_quantity__gt=0
-                            ).order_by("-batch_number")
-
-                            for batch in batches:
-                                if remaining_to_reduce <= 0:
-                                    break
-
-                                if batch.remaining_quantity >= remaining_to_reduce:
-                                    batch.remaining_quantity -= remaining_to_reduce
-                                    batch.save()
-                                    remaining_to_reduce = 0
-                                else:
-                                    remaining_to_reduce -= batch.remaining_quantity
-                                    batch.remaining_quantity = 0
-                                    batch.save()
-
-                except Item.DoesNotExist:
-                    print(f"❌ Item with ID {item_id} does not exist, skipping...")
-                    continue
-                except Exception as e:
-                    print(f"🚨 Unexpected error processing item {item_id}: {e}")
-                    raise
+        # Negative adjustments reduce from existing batches (LIFO); new
+        # batches are numbered after each item's existing ones
+        self.save_batch_changes(new_batches, adjustment_reductions)
 
         print(f"🎉 Transaction {transaction.transaction_id} created successfully!")
         return transaction
@@ -3,8 +3,8 @@ from .models import (
     Item, Brand, Customer, Transaction, TransactionItem, Account, 
     CustomerBrandPricing, ItemTierPricing, CustomerSpecialPricing
 )
-from django.utils import timezone
-import pytz
+from .serializers import DATE_FORMAT, PrefetchingListSerializer, format_ph_datetime
+from django.db.models import Prefetch
 
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
@@ -58,6 +58,11 @@ class ItemSerializer(serializers.ModelSerializer):
     brand_name = serializers.CharField(source='brand.brand_name', read_only=True)
     brand_id = serializers.IntegerField(source='brand.brand_id', read_only=True)
     uom_display = serializers.CharField(source='get_uom_display', read_only=True)
+
+    # Stock figures read straight off the row: current_stock is kept by a
+    # trigger and the batch count is annotated by Item.objects.with_stock()
+    total_quantity = serializers.IntegerField(source='current_stock', read_only=True)
+    active_batches_count = serializers.IntegerField(read_only=True)
     
     # Pricing information from new structure
     tier_pricing = ItemTierPricingSerializer(many=True, read_only=True)
@@ -66,7 +71,7 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = [
             'item_id', 'brand', 'brand_name', 'brand_id', 'item_name', 
-            'model_number', 'sku', 'uom', 'uom_display', 'quantity',
+            'sku', 'uom', 'uom_display', 'total_quantity', 'active_batches_count',
             'created_at', 'updated_at', 'tier_pricing'
         ]
         read_only_fields = ['item_id', 'created_at', 'updated_at', 'brand_name', 'brand_id']
@@ -74,6 +79,8 @@ class ItemSerializer(serializers.ModelSerializer):
 class TransactionItemSerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source='item.item_name', read_only=True)
     pricing_tier_display = serializers.CharField(source='get_pricing_tier_display', read_only=True)
+    # Generated column; declared so it still renders as a decimal string
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     
     class Meta:
         model = TransactionItem
@@ -100,18 +107,22 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = '__all__'
         read_only_fields = ['transaction_id', 'transacted_date', 'created_at']
+        # Loads what each row reads for a whole list at once; see
+        # PrefetchingListSerializer
+        list_serializer_class = PrefetchingListSerializer
+        prefetch_lookups = (
+            'brand',
+            'customer',
+            'account',
+            Prefetch('items', queryset=TransactionItem.objects.select_related('item')),
+        )
     
     def get_transacted_date_formatted(self, obj):
-        ph_tz = pytz.timezone('Asia/Manila')
-        ph_date = timezone.make_aware(
-            timezone.datetime.combine(obj.transacted_date, timezone.datetime.min.time())
-        ).astimezone(ph_tz)
-        return ph_date.strftime('%B %d, %Y')
+        # A plain date has no time of day to convert to Manila time
+        return obj.transacted_date.strftime(DATE_FORMAT)
     
     def get_created_at_formatted(self, obj):
-        ph_tz = pytz.timezone('Asia/Manila')
-        ph_datetime = obj.created_at.astimezone(ph_tz)
-        return ph_datetime.strftime('%B %d, %Y, %I:%M %p')
+        return format_ph_datetime(obj.created_at)
 
 class TransactionCreateSerializer(serializers.ModelSerializer):
     items = serializers.ListField(write_only=True)
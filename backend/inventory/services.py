@@ -8,9 +8,9 @@ from .models import (
     Customer,
     Item,
     CustomerBrandPricing,
-    ItemTierPricing,
     CustomerSpecialPricing,
     Account,
+    PRICING_TIER_DISPLAY,
     PRICING_TIER_HIERARCHY,
 )
 
@@ -62,9 +62,7 @@ class PricingService:
             pricing_details["pricing_tier"] = pricing_tier
 
             # Step 2: Find the standard price for the item at that pricing tier
-            item_tier_pricing = ItemTierPricing.objects.filter(
-                item=item, pricing_tier=pricing_tier
-            ).first()
+            item_tier_pricing = item.get_tier_pricing(pricing_tier)
 
             if not item_tier_pricing:
                 pricing_details["error"] = (
@@ -168,7 +166,7 @@ class PricingService:
         Returns:
             List of tier codes the user can sell at
         """
-        return user.get_allowed_selling_tiers()
+        return list(user.get_allowed_selling_tiers())
 
     @staticmethod
     def get_user_allowed_selling_tiers_with_labels(user: Account) -> list:
@@ -181,14 +179,9 @@ class PricingService:
         Returns:
             List of dictionaries with 'value' and 'label' keys
         """
-        from .models import PRICING_TIER_CHOICES
-
-        allowed_tiers = user.get_allowed_selling_tiers()
-        tier_dict = dict(PRICING_TIER_CHOICES)
-
         return [
-            {"value": tier, "label": tier_dict.get(tier, tier)}
-            for tier in allowed_tiers
+            {"value": tier, "label": PRICING_TIER_DISPLAY.get(tier, tier)}
+            for tier in user.get_allowed_selling_tiers()
         ]
 
     @staticmethod
@@ -240,10 +233,9 @@ class PricingService:
                 pricing_details["tier_restriction_violated"] = True
                 return Decimal("0.00"), pricing_details
 
-            # Try to get price at the requested tier
-            item_tier_pricing = ItemTierPricing.objects.filter(
-                item=item, pricing_tier=requested_tier
-            ).first()
+            # Try to get price at the requested tier; get_price() already
+            # loaded the item's tier prices
+            item_tier_pricing = item.get_tier_pricing(requested_tier)
 
             if item_tier_pricing:
                 final_price = item_tier_pricing.price
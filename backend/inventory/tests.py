@@ -1,3 +1,533 @@
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import (
+    Account,
+    Brand,
+    Customer,
+    CustomerBrandPricing,
+    CustomerSpecialPricing,
+    Item,
+    ItemBatch,
+    ItemTierPricing,
+    Transaction,
+    TransactionItem,
+)
+from .serializers import (
+    CustomerSpecialPricingSerializer,
+    TransactionCreateSerializer,
+)
+
+
+class InventoryTestCase(TestCase):
+    """
+    Base for tests that need a brand, an account and an item. These run
+    against PostgreSQL, since the stock, total and reference number
+    bookkeeping lives in database triggers and functions.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user(
+            username="test_admin", password="test-password", role="Admin"
+        )
+        cls.brand = Brand.objects.create(brand_name="Test Brand")
+        cls.item = Item.objects.create(brand=cls.brand, item_name="Test Serum")
+
+    def add_batch(self, quantity, item=None, cost_price=100, transaction=None):
+        return ItemBatch.objects.create(
+            item=item or self.item,
+            cost_price=cost_price,
+            initial_quantity=quantity,
+            remaining_quantity=quantity,
+            transaction=transaction,
+        )
+
+    def remaining_quantities(self, item=None):
+        """Remaining quantity of each of the item's batches, oldest first"""
+        return list(
+            ItemBatch.objects.filter(item=item or self.item)
+            .order_by("batch_number")
+            .values_list("remaining_quantity", flat=True)
+        )
+
+
+class ReduceNewestFirstTests(InventoryTestCase):
+    def setUp(self):
+        for quantity in (4, 5, 3):
+            self.add_batch(quantity)
+
+    def test_partial_reduction_takes_from_newest_batches(self):
+        ItemBatch.reduce_newest_first({self.item.pk: 6})
+
+        self.assertEqual(self.remaining_quantities(), [4, 2, 0])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_stock, 6)
+
+    def test_reduction_beyond_stock_empties_the_item(self):
+        other_item = Item.objects.create(brand=self.brand, item_name="Test Toner")
+        self.add_batch(7, item=other_item)
+
+        ItemBatch.reduce_newest_first({self.item.pk: 100})
+
+        self.assertEqual(self.remaining_quantities(), [0, 0, 0])
+        self.assertEqual(self.remaining_quantities(other_item), [7])
+
+    def test_no_quantities_is_a_no_op(self):
+        with self.assertNumQueries(0):
+            ItemBatch.reduce_newest_first({})
+
+
+class AdjustmentLineOrderTests(InventoryTestCase):
+    """Adjustment lines for the same item apply in the order they were sent"""
+
+    def setUp(self):
+        self.add_batch(10)
+
+    def adjust(self, *quantity_changes):
+        serializer = TransactionCreateSerializer(
+            data={
+                "transaction_type": Transaction.TransactionType.ADJUSTMENT,
+                "brand": self.brand.pk,
+                "account": self.account.pk,
+                "items": [
+                    {"item": self.item.pk, "quantity_change": quantity_change}
+                    for quantity_change in quantity_changes
+                ],
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_reduction_after_addition_takes_from_the_new_batch(self):
+        self.adjust(5, -3)
+
+        self.assertEqual(self.remaining_quantities(), [10, 2])
+
+    def test_reduction_before_addition_takes_from_existing_batches(self):
+        self.adjust(-3, 5)
+
+        self.assertEqual(self.remaining_quantities(), [7, 5])
+
+    def test_zero_or_missing_quantity_is_rejected(self):
+        for line in (
+            {"item": self.item.pk, "quantity_change": 0},
+            {"item": self.item.pk},
+        ):
+            with self.subTest(line=line):
+                serializer = TransactionCreateSerializer(
+                    data={
+                        "transaction_type": Transaction.TransactionType.ADJUSTMENT,
+                        "brand": self.brand.pk,
+                        "account": self.account.pk,
+                        "items": [line],
+                    }
+                )
+
+                self.assertFalse(serializer.is_valid())
+                self.assertIn("items", serializer.errors)
+
+    def test_alternating_lines(self):
+        self.adjust(-2, 4, -6, 3)
+
+        self.assertEqual(self.remaining_quantities(), [6, 0, 3])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_stock, 9)
+
+
+class BrandDeleteTests(InventoryTestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            company_name="Test Customer",
+            contact_person="Test Contact",
+            address="Test Address",
+            contact_number="09170000000",
+            customer_type=Customer.CustomerType.DIRECT_CUSTOMER,
+        )
+        self.other_brand = Brand.objects.create(brand_name="Other Brand")
+        self.other_item = Item.objects.create(
+            brand=self.other_brand, item_name="Other Serum"
+        )
+
+        incoming = Transaction.objects.create(
+            brand=self.brand,
+            account=self.account,
+            transaction_type=Transaction.TransactionType.INCOMING,
+        )
+        self.batch = self.add_batch(5, transaction=incoming)
+        # The other brand's batch points at this brand's transaction
+        self.other_batch = self.add_batch(5, item=self.other_item, transaction=incoming)
+        ItemTierPricing.objects.create(item=self.item, pricing_tier="SRP", price=150)
+        CustomerBrandPricing.objects.create(
+            customer=self.customer, brand=self.brand, pricing_tier="RS"
+        )
+
+        # A sale under the other brand with a line for each brand's item
+        self.sale = Transaction.objects.create(
+            brand=self.other_brand,
+            customer=self.customer,
+            account=self.account,
+            transaction_type=Transaction.TransactionType.OUTGOING,
+        )
+        TransactionItem.objects.create(
+            transaction=self.sale,
+            item=self.item,
+            batch=self.batch,
+            quantity=1,
+            unit_price=150,
+        )
+        self.other_line = TransactionItem.objects.create(
+            transaction=self.sale,
+            item=self.other_item,
+            batch=self.other_batch,
+            quantity=1,
+            unit_price=150,
+        )
+
+    def assert_brand_removed(self):
+        self.assertFalse(Brand.objects.filter(pk=self.brand.pk).exists())
+        self.assertFalse(Item.objects.filter(brand=self.brand.pk).exists())
+        self.assertFalse(ItemBatch.objects.filter(pk=self.batch.pk).exists())
+        self.assertFalse(Transaction.objects.filter(brand=self.brand.pk).exists())
+        self.assertFalse(ItemTierPricing.objects.filter(item=self.item.pk).exists())
+        self.assertFalse(
+            CustomerBrandPricing.objects.filter(brand=self.brand.pk).exists()
+        )
+        self.assertFalse(TransactionItem.objects.filter(item=self.item.pk).exists())
+
+        # The other brand keeps its rows, without references to this one
+        self.other_batch.refresh_from_db()
+        self.assertIsNone(self.other_batch.transaction_id)
+        self.assertEqual(
+            list(self.sale.items.values_list("pk", flat=True)), [self.other_line.pk]
+        )
+        self.assertTrue(Item.objects.filter(pk=self.other_item.pk).exists())
+
+    def test_queryset_delete_removes_dependents(self):
+        total, deleted = Brand.objects.filter(pk=self.brand.pk).delete()
+
+        self.assert_brand_removed()
+        self.assertEqual(
+            deleted,
+            {
+                Brand._meta.label: 1,
+                Item._meta.label: 1,
+                ItemBatch._meta.label: 1,
+                ItemTierPricing._meta.label: 1,
+                CustomerBrandPricing._meta.label: 1,
+                Transaction._meta.label: 1,
+                TransactionItem._meta.label: 1,
+            },
+        )
+        self.assertEqual(total, 7)
+
+    def test_instance_delete_removes_dependents(self):
+        self.brand.delete()
+
+        self.assert_brand_removed()
+        self.assertIsNone(self.brand.pk)
+
+
+class CustomerSpecialPricingSerializerTests(InventoryTestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            company_name="Test Customer",
+            contact_person="Test Contact",
+            address="Test Address",
+            contact_number="09170000000",
+            customer_type=Customer.CustomerType.DIRECT_CUSTOMER,
+        )
+
+    def test_non_negative_discount_is_rejected_on_create(self):
+        serializer = CustomerSpecialPricingSerializer(
+            data={"customer": self.customer.pk, "item": self.item.pk, "discount": 0}
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("discount", serializer.errors)
+
+    def test_non_negative_discount_is_rejected_on_update(self):
+        special_pricing = CustomerSpecialPricing.objects.create(
+            customer=self.customer, item=self.item, discount=-10
+        )
+        serializer = CustomerSpecialPricingSerializer(
+            special_pricing, data={"discount": 5}, partial=True
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("discount", serializer.errors)
+
+
+class TransactionListMineFilterTests(InventoryTestCase):
+    def setUp(self):
+        self.sales_rep = Account.objects.create_user(
+            username="test_sales_rep", password="test-password", role="Sales Rep"
+        )
+        self.own_transaction = self.create_transaction(self.sales_rep)
+        self.other_transaction = self.create_transaction(self.account)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sales_rep)
+
+    def create_transaction(self, account):
+        return Transaction.objects.create(
+            brand=self.brand,
+            account=account,
+            transaction_type=Transaction.TransactionType.ADJUSTMENT,
+        )
+
+    def listed_transaction_ids(self, **params):
+        response = self.client.get(reverse("transaction-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return {row["transaction_id"] for row in response.data["results"]}
+
+    def test_mine_lists_only_the_users_transactions(self):
+        self.assertEqual(
+            self.listed_transaction_ids(mine="true"),
+            {self.own_transaction.pk},
+        )
+
+    def test_without_mine_every_transaction_is_listed(self):
+        self.assertEqual(
+            self.listed_transaction_ids(),
+            {self.own_transaction.pk, self.other_transaction.pk},
+        )
+
+
+class CurrentStockTriggerTests(InventoryTestCase):
+    def current_stock(self, item=None):
+        item = item or self.item
+        item.refresh_from_db(fields=["current_stock"])
+        return item.current_stock
+
+    def test_batch_insert_adds_to_stock(self):
+        self.add_batch(5)
+        self.add_batch(3)
+
+        self.assertEqual(self.current_stock(), 8)
+
+    def test_batch_update_changes_stock(self):
+        batch = self.add_batch(5)
+
+        batch.remaining_quantity = 2
+        batch.save()
+        self.assertEqual(self.current_stock(), 2)
+
+        ItemBatch.objects.filter(pk=batch.pk).update(remaining_quantity=4)
+        self.assertEqual(self.current_stock(), 4)
+
+    def test_batch_delete_removes_from_stock(self):
+        batch = self.add_batch(5)
+        self.add_batch(3)
+
+        batch.delete()
+
+        self.assertEqual(self.current_stock(), 3)
+
+    def test_moving_a_batch_moves_its_stock(self):
+        other_item = Item.objects.create(brand=self.brand, item_name="Test Toner")
+        batch = self.add_batch(5)
+
+        ItemBatch.objects.filter(pk=batch.pk).update(item=other_item)
+
+        self.assertEqual(self.current_stock(), 0)
+        self.assertEqual(self.current_stock(other_item), 5)
+
+
+class TotalAmountTriggerTests(InventoryTestCase):
+    def setUp(self):
+        self.transaction = Transaction.objects.create(
+            brand=self.brand,
+            account=self.account,
+            transaction_type=Transaction.TransactionType.ADJUSTMENT,
+        )
+
+    def add_line(self, quantity, unit_price, transaction=None):
+        return TransactionItem.objects.create(
+            transaction=transaction or self.transaction,
+            item=self.item,
+            quantity=quantity,
+            unit_price=unit_price,
+        )
+
+    def total_amount(self, transaction=None):
+        transaction = transaction or self.transaction
+        transaction.refresh_from_db(fields=["total_amount"])
+        return transaction.total_amount
+
+    def test_total_follows_inserted_lines(self):
+        self.add_line(2, 150)
+        TransactionItem.objects.bulk_create(
+            [
+                TransactionItem(
+                    transaction=self.transaction,
+                    item=self.item,
+                    quantity=1,
+                    unit_price=Decimal("99.50"),
+                )
+            ]
+        )
+
+        self.assertEqual(self.total_amount(), Decimal("399.50"))
+
+    def test_total_follows_updated_lines(self):
+        line = self.add_line(2, 150)
+
+        line.quantity = 3
+        line.save()
+        self.assertEqual(self.total_amount(), Decimal("450.00"))
+
+        TransactionItem.objects.filter(pk=line.pk).update(unit_price=100)
+        self.assertEqual(self.total_amount(), Decimal("300.00"))
+
+    def test_total_follows_deleted_lines(self):
+        line = self.add_line(2, 150)
+        self.add_line(1, 50)
+
+        line.delete()
+
+        self.assertEqual(self.total_amount(), Decimal("50.00"))
+
+    def test_moving_a_line_moves_its_total(self):
+        other_transaction = Transaction.objects.create(
+            brand=self.brand,
+            account=self.account,
+            transaction_type=Transaction.TransactionType.ADJUSTMENT,
+        )
+        line = self.add_line(2, 150)
+
+        TransactionItem.objects.filter(pk=line.pk).update(
+            transaction=other_transaction
+        )
+
+        self.assertEqual(self.total_amount(), Decimal("0.00"))
+        self.assertEqual(self.total_amount(other_transaction), Decimal("300.00"))
+
+
+class ReferenceNumberTests(InventoryTestCase):
+    def create_transaction(self, **fields):
+        return Transaction.objects.create(
+            brand=self.brand,
+            account=self.account,
+            transaction_type=Transaction.TransactionType.ADJUSTMENT,
+            **fields,
+        )
+
+    @contextmanager
+    def database_year(self, year):
+        """Make now() in the database fall in the given year"""
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW search_path")
+            search_path = cursor.fetchone()[0]
+            cursor.execute("CREATE SCHEMA test_clock")
+            cursor.execute(
+                "CREATE FUNCTION test_clock.now() RETURNS timestamptz AS "
+                f"$$ SELECT timestamptz '{year}-06-01 00:00:00+00' $$ LANGUAGE sql"
+            )
+            # pg_catalog is searched first unless it is listed explicitly
+            cursor.execute(
+                f"SET LOCAL search_path = test_clock, pg_catalog, {search_path}"
+            )
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET LOCAL search_path = {search_path}")
+
+    def test_reference_numbers_are_unique_and_sequential(self):
+        year = timezone.now().year
+
+        references = [self.create_transaction().reference_number for _ in range(3)]
+
+        self.assertEqual(references, [f"{year}-0001", f"{year}-0002", f"{year}-0003"])
+
+    def test_numbering_continues_after_existing_references(self):
+        year = timezone.now().year
+        self.create_transaction(reference_number=f"{year}-0041")
+
+        self.assertEqual(self.create_transaction().reference_number, f"{year}-0042")
+
+    def test_numbering_rolls_over_per_year(self):
+        year = timezone.now().year
+        next_year = year + 1
+        self.assertEqual(self.create_transaction().reference_number, f"{year}-0001")
+
+        with self.database_year(next_year):
+            self.assertEqual(
+                self.create_transaction().reference_number, f"{next_year}-0001"
+            )
+            self.assertEqual(
+                self.create_transaction().reference_number, f"{next_year}-0002"
+            )
+
+        # The current year's sequence carries on where it was
+        self.assertEqual(self.create_transaction().reference_number, f"{year}-0002")
+
+    def test_saving_without_a_reference_assigns_one(self):
+        transaction = self.create_transaction()
+        Transaction.objects.filter(pk=transaction.pk).update(reference_number=None)
+        transaction.reference_number = None
+
+        transaction.save()
+
+        transaction.refresh_from_db(fields=["reference_number"])
+        self.assertRegex(
+            transaction.reference_number, rf"^{timezone.now().year}-\d{{4}}$"
+        )
+
+
+class ItemSkuTests(InventoryTestCase):
+    def test_sku_is_generated_per_brand(self):
+        brand_code = self.brand.pk + 100
+        item = Item.objects.create(brand=self.brand, item_name="Test Toner")
+
+        self.assertEqual(self.item.sku, f"{brand_code}-001")
+        self.assertEqual(item.sku, f"{brand_code}-002")
+
+    def test_save_retries_when_the_sku_was_taken_meanwhile(self):
+        generate_sku = Item.generate_sku
+        taken_sku = self.item.sku
+
+        def stale_then_fresh(item):
+            # The first SKU is what a concurrent create had just saved
+            if generate_sku_mock.call_count == 1:
+                return taken_sku
+            return generate_sku(item)
+
+        with mock.patch.object(
+            Item, "generate_sku", autospec=True, side_effect=stale_then_fresh
+        ) as generate_sku_mock:
+            item = Item.objects.create(brand=self.brand, item_name="Test Toner")
+
+        self.assertEqual(generate_sku_mock.call_count, 2)
+        self.assertIsNotNone(item.pk)
+        self.assertNotEqual(item.sku, taken_sku)
+        self.assertTrue(Item.objects.filter(pk=item.pk, sku=item.sku).exists())
+
+    def test_save_gives_up_after_the_last_attempt(self):
+        taken_sku = self.item.sku
+
+        with mock.patch.object(
+            Item, "generate_sku", return_value=taken_sku
+        ) as generate_sku_mock, self.assertRaises(IntegrityError):
+            Item.objects.create(brand=self.brand, item_name="Test Toner")
+
+        self.assertEqual(generate_sku_mock.call_count, Item.SKU_SAVE_ATTEMPTS)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        # Item names are unique per brand regardless of case
+        item = Item(brand=self.brand, item_name=self.item.item_name.upper())
+
+        with mock.patch.object(
+            Item, "generate_sku", autospec=True, side_effect=Item.generate_sku
+        ) as generate_sku_mock, self.assertRaises(IntegrityError):
+            item.save()
 
-# Create your tests here.
+        self.assertEqual(generate_sku_mock.call_count, 1)
+        self.assertIsNone(item.sku)
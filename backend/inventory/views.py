@@ -2,7 +2,7 @@ from django.shortcuts import render, get_object_or_404
 from django.db import models
 from django.db.models import Q
 from django.utils import timezone
-from rest_framework import viewsets, status, serializers
+from rest_framework import viewsets, status
 from rest_framework.decorators import action, permission_classes as permission_decorator
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -31,6 +31,7 @@ from .models import (
     ItemTierPricing,
     CustomerSpecialPricing,
     ItemBatch,
+    PRICING_TIER_CODES,
 )
 from .serializers import (
     ItemSerializer,
@@ -127,7 +128,7 @@ class ItemViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filter items based on query parameters"""
-        queryset = Item.objects.select_related("brand").all()
+        queryset = Item.objects.for_list()
 
         # Filter by brand
         brand = self.request.query_params.get("brand")
@@ -176,19 +177,8 @@ class ItemViewSet(viewsets.ModelViewSet):
                 {"error": "Brand not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        # Generate the next SKU
-        brand_code = brand.brand_id + 100
-        item_count = Item.objects.filter(brand=brand).count() + 1
-        item_number = f"{item_count:03d}"
-
-        # Check if this SKU already exists and increment if needed
-        sku = f"{brand_code}-{item_number}"
-        while Item.objects.filter(sku=sku).exists():
-            item_count += 1
-            item_number = f"{item_count:03d}"
-            sku = f"{brand_code}-{item_number}"
-
-        return Response({"next_sku": sku})
+        # Generate the next SKU the same way Item.save() will
+        return Response({"next_sku": Item(brand=brand).generate_sku()})
 
     @action(detail=True, methods=["get"], url_path="next-batch-number")
     def next_batch_number(self, request, pk=None):
@@ -213,8 +203,9 @@ class ItemViewSet(viewsets.ModelViewSet):
     def pricing_tiers(self, request, pk=None):
         """Get all pricing tiers for this item"""
         item = self.get_object()
-        pricing_tiers = ItemTierPricing.objects.filter(item=item)
-        serializer = ItemTierPricingSerializer(pricing_tiers, many=True)
+        # Already prefetched by Item.objects.for_list(), with each row's item
+        # set to this one
+        serializer = ItemTierPricingSerializer(item.tier_pricing.all(), many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=["post"])
@@ -229,6 +220,11 @@ class ItemViewSet(viewsets.ModelViewSet):
                 {"error": "pricing_tier and price are required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if pricing_tier not in PRICING_TIER_CODES:
+            return Response(
+                {"error": f"Invalid pricing tier: {pricing_tier}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         tier_pricing, created = ItemTierPricing.objects.update_or_create(
             item=item,
@@ -254,6 +250,7 @@ class ItemViewSet(viewsets.ModelViewSet):
         # Get all transaction items for this item
         transaction_items = (
             TransactionItem.objects.filter(item=item)
+            .with_quantity_change()
             .select_related(
                 "transaction",
                 "transaction__customer",
@@ -266,16 +263,10 @@ class ItemViewSet(viewsets.ModelViewSet):
         # Build history response
         history_data = []
         for trans_item in transaction_items:
-            # Calculate correct quantity change with proper signs
-            if trans_item.transaction.transaction_type == "OUTGOING":
-                quantity_change = -trans_item.quantity
-            else:
-                quantity_change = trans_item.quantity
-
             history_entry = {
                 "item": item.item_id,
                 "item_name": item.item_name,
-                "quantity_change": quantity_change,
+                "quantity_change": trans_item.quantity_change,
                 "created_at": trans_item.created_at,
                 "transaction_id": trans_item.transaction.transaction_id,
                 "transaction_type": trans_item.transaction.transaction_type,
@@ -531,7 +522,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
 
 
 class CustomerBrandPricingViewSet(viewsets.ModelViewSet):
-    queryset = CustomerBrandPricing.objects.all()
+    queryset = CustomerBrandPricing.objects.with_str()
     serializer_class = CustomerBrandPricingSerializer
     permission_classes = [IsAuthenticated]
 
@@ -598,22 +589,17 @@ class CustomerBrandPricingViewSet(viewsets.ModelViewSet):
 
 
 class ItemTierPricingViewSet(viewsets.ModelViewSet):
-    queryset = ItemTierPricing.objects.all()
+    queryset = ItemTierPricing.objects.with_str()
     serializer_class = ItemTierPricingSerializer
     permission_classes = [IsAuthenticated]
 
 
 class CustomerSpecialPricingViewSet(viewsets.ModelViewSet):
-    queryset = CustomerSpecialPricing.objects.all()
+    queryset = CustomerSpecialPricing.objects.with_str()
     serializer_class = CustomerSpecialPricingSerializer
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
-        # Validate discount is negative
-        discount = serializer.validated_data.get("discount")
-        if not PricingService.validate_special_pricing_discount(discount):
-            raise serializers.ValidationError("Discount must be negative")
-
         serializer.save(created_by=self.request.user)
 
 
@@ -628,9 +614,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filter transactions based on query parameters"""
-        queryset = Transaction.objects.select_related(
-            "brand", "customer", "account"
-        ).all()
+        queryset = Transaction.objects.for_list()
 
         # Debug: log the query parameters
         print(f"Transaction query params: {dict(self.request.query_params)}")
@@ -653,10 +637,15 @@ class TransactionViewSet(viewsets.ModelViewSet):
             if status.lower() == "pending":
                 # Pending = OUTGOING transactions that are not fully completed
                 print("Filtering for pending transactions")
-                # Handle both old and new transaction type formats
+                # Handle both old and new transaction type formats; the
+                # generated is_completed column only covers OUTGOING
                 queryset = queryset.filter(
-                    transaction_type__in=["OUTGOING", "Dispatch goods"]
-                ).exclude(is_released=True, is_paid=True, is_or_sent=True)
+                    Q(transaction_type="OUTGOING", is_completed=False)
+                    | (
+                        Q(transaction_type="Dispatch goods")
+                        & ~Q(is_released=True, is_paid=True, is_or_sent=True)
+                    )
+                )
             elif status.lower() == "completed":
                 # Completed = INCOMING, ADJUSTMENT transactions or fully completed OUTGOING transactions
                 print("Filtering for completed transactions")
@@ -668,7 +657,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
                     transaction_type="Manual correction"
                 )
                 outgoing_completed_filter = Q(
-                    transaction_type__in=["OUTGOING", "Dispatch goods"],
+                    transaction_type="OUTGOING", is_completed=True
+                ) | Q(
+                    transaction_type="Dispatch goods",
                     is_released=True,
                     is_paid=True,
                     is_or_sent=True,
@@ -735,6 +726,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
                     transaction_type="OUTGOING", is_or_sent=False
                 )
 
+        # The frontend asks sales users for only the transactions they made
+        if self.request.query_params.get("mine") == "true":
+            queryset = queryset.filter(account=self.request.user)
+
         # Filter by date range
         start_date = self.request.query_params.get("startDate")
         end_date = self.request.query_params.get("endDate")
@@ -763,12 +758,15 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Update the boolean fields
+        # Update the boolean fields, writing only the ones sent
+        updated_fields = []
         for field in ["is_released", "is_paid", "is_or_sent"]:
             if field in request.data:
                 setattr(transaction, field, request.data[field])
+                updated_fields.append(field)
 
-        transaction.save()
+        if updated_fields:
+            transaction.save(update_fields=updated_fields)
 
         serializer = self.get_serializer(transaction)
         return Response(serializer.data)
@@ -781,7 +779,11 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
 
 class TransactionItemViewSet(viewsets.ModelViewSet):
-    queryset = TransactionItem.objects.all()
+    queryset = (
+        TransactionItem.objects.with_str()
+        .with_quantity_change()
+        .select_related("item__brand", "batch")
+    )
     serializer_class = TransactionItemSerializer
     permission_classes = [IsAuthenticated]
 
@@ -825,43 +827,39 @@ class DashboardStatsView(APIView):
     def get(self, request):
         try:
             # Basic counts
-            total_items = Item.objects.count()
             total_customers = Customer.objects.filter(status="Active").count()
             total_brands = Brand.objects.filter(status="Active").count()
 
-            # Transaction counts
-            pending_outgoing = (
-                Transaction.objects.filter(transaction_type="OUTGOING")
-                .exclude(is_released=True, is_paid=True, is_or_sent=True)
-                .count()
+            # Pending and completed OUTGOING transaction counts in one query
+            outgoing_counts = Transaction.objects.filter(
+                transaction_type="OUTGOING"
+            ).aggregate(
+                pending=Count("pk", filter=Q(is_completed=False)),
+                completed=Count("pk", filter=Q(is_completed=True)),
             )
-
-            completed_outgoing = Transaction.objects.filter(
-                transaction_type="OUTGOING",
-                is_released=True,
-                is_paid=True,
-                is_or_sent=True,
-            ).count()
+            pending_outgoing = outgoing_counts["pending"]
+            completed_outgoing = outgoing_counts["completed"]
 
             # Recent transactions
-            recent_transactions = Transaction.objects.all().order_by("-created_at")[:5]
+            recent_transactions = Transaction.objects.for_list().order_by(
+                "-created_at"
+            )[:5]
             recent_transactions_data = TransactionSerializer(
                 recent_transactions, many=True
             ).data
 
-            # Low stock items and out of stock items
-            # Since quantity is now calculated from batches, we need to calculate this differently
-            low_stock_items = 0
-            out_of_stock_items = 0
-
-            # Get all items and calculate their stock levels
-            all_items = Item.objects.all()
-            for item in all_items:
-                total_qty = item.total_quantity  # This uses the calculated property
-                if total_qty == 0:
-                    out_of_stock_items += 1
-                elif total_qty <= 10:  # threshold of 10
-                    low_stock_items += 1
+            # Item total, low stock items and out of stock items, counted from
+            # the current_stock column (low stock threshold of 10)
+            stock_counts = Item.objects.aggregate(
+                total_items=Count("pk"),
+                out_of_stock_items=Count("pk", filter=Q(current_stock=0)),
+                low_stock_items=Count(
+                    "pk", filter=Q(current_stock__gt=0, current_stock__lte=10)
+                ),
+            )
+            total_items = stock_counts["total_items"]
+            low_stock_items = stock_counts["low_stock_items"]
+            out_of_stock_items = stock_counts["out_of_stock_items"]
 
             return Response(
                 {
@@ -891,13 +889,15 @@ class ReportView(APIView):
 
         if report_type == "sales":
             # Sales report
-            sales_transactions = Transaction.objects.filter(transaction_type="OUTGOING")
+            sales_transactions = Transaction.objects.for_list().filter(
+                transaction_type="OUTGOING"
+            )
             data = TransactionSerializer(sales_transactions, many=True).data
             return Response({"transactions": data})
 
         elif report_type == "inventory":
             # Inventory report
-            items = Item.objects.all()
+            items = Item.objects.for_list()
             data = ItemSerializer(items, many=True).data
             return Response({"items": data})
 
@@ -1008,8 +1008,12 @@ class ItemBatchViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            item = Item.objects.get(pk=item_id)
-            batches = ItemBatch.objects.filter(item=item).order_by("batch_number")
+            item = Item.objects.for_list().get(pk=item_id)
+            # Read through the item so every batch shares it (and its brand)
+            # instead of loading it again per batch
+            batches = item.batches.select_related("transaction").order_by(
+                "batch_number"
+            )
             serializer = self.get_serializer(batches, many=True)
             return Response(
                 {"item": ItemSerializer(item).data, "batches": serializer.data}
@@ -1022,27 +1026,7 @@ class ItemBatchViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def next_reference_number(self, request):
         """Get the next available reference number for preview"""
-        from django.utils import timezone
-
-        current_year = timezone.now().year
-
-        # Get the last transaction for the current year
-        last_transaction = (
-            Transaction.objects.filter(reference_number__startswith=f"{current_year}-")
-            .order_by("-reference_number")
-            .first()
-        )
-
-        if last_transaction and last_transaction.reference_number:
-            try:
-                last_number = int(last_transaction.reference_number.split("-")[1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
-
-        next_ref = f"{current_year}-{next_number:04d}"
+        next_ref = Transaction.preview_reference_number()
         return Response({"next_reference_number": next_ref})
 
     # ...existing code...